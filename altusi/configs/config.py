@@ -1,4 +1,5 @@
 import os
+import json
 
 #===============================================================================
 # PROJECT'S ORGANIZATION
@@ -27,13 +28,111 @@ CV_DNN_FACE_MODEL = os.path.join(HUMAN_FACE_MODEL_DIR,
 # Facial landmark detection
 DLIB_FACIAL_LANDMARK_MODEL = os.path.join(HUMAN_FACE_MODEL_DIR,
                                     'shape_predictor_68_face_landmarks.dat')
+DLIB_FACIAL_LANDMARK_5_MODEL = os.path.join(HUMAN_FACE_MODEL_DIR,
+                                    'shape_predictor_5_face_landmarks.dat')
+DLIB_FACIAL_LANDMARK_MODELS = {
+    5: DLIB_FACIAL_LANDMARK_5_MODEL,
+    68: DLIB_FACIAL_LANDMARK_MODEL
+}
 
 
 #===============================================================================
 # IMAGE'S PARAMETERS
 #===============================================================================
+# Face alignment: size of square face chips and reference positions of
+# (left eye, right eye, nose base) in a chip, normalized to [0, 1]. This is a
+# custom template: eyes follow ArcFace's template but the nose base, the only
+# nose point of the 5-point model, takes ArcFace's nose-tip position, so chips
+# are not ArcFace-compatible; models expecting ArcFace alignment need their
+# own template and nose-tip anchors
+FACE_CHIP_SIZE = 112
+FACE_CHIP_TEMPLATE = [(0.3419, 0.4616), (0.6565, 0.4598), (0.5002, 0.6405)]
+
+
+#===============================================================================
+# PIPELINE'S PARAMETERS
+#===============================================================================
+# defaults below are overridden by the `selected` entry of a performance
+# profile written by `auto-tuner.py`, if one exists
+PERF_PROFILE = os.path.join(PROJECT_BASE, 'perf-profile.json')
+
+FRAME_HEIGHT = 600          # working height frames are resized to
+DNN_INPUT_SIZE = 300        # input size of OpenCV-DNN face detector
+FACE_CONF = 0.8             # confidence threshold of OpenCV-DNN face detector
+FRAME_SKIP = 3              # process one frame out of every FRAME_SKIP frames
+NUM_THREADS = -1            # OpenCV threads, negative keeps OpenCV's default
+NUM_WORKERS = 1             # parallel workers of facial landmark detection
+
+LANDMARK_POOL = 'auto'      # kind of landmarking workers: thread/process/auto
+LANDMARK_MIN_FACES = 4      # minimum faces in a frame to landmark in parallel
+LANDMARK_CALIBRATE_FRAMES = 5 # crowded frames timed to choose the kind of workers
+
+RECORD_CODEC = 'MJPG'       # FourCC code of recorded videos
+RECORD_QUEUE_SIZE = 8       # frames waiting for the recording encoder
+RECORD_POLICY = 'drop'      # when the encoder lags: drop frames or block
+
+LANDMARK_POINTS = 5         # facial points located unless more are requested
+LANDMARK_UPGRADE_SIZE = 200 # minimum face height landmarked with 68 points
+LANDMARK_UPGRADE_EVERY = 10 # landmark all faces with 68 points every K frames
+
+KEYFRAME_MIN_GAP = 2        # offline tracking: minimum frames between keyframes
+KEYFRAME_MAX_GAP = 15       # offline tracking: maximum frames between keyframes
+KEYFRAME_MOTION = 20.       # offline tracking: motion budget triggering a keyframe
+KEYFRAME_CHECK_EVERY = 50   # offline tracking: full inference every N frames
+KEYFRAME_SMOOTH = 1.        # offline tracking: smoothing weight, 1 disables it
+
+IMAGE_PREFETCH = 32         # image batch mode: images decoded ahead of inference
+IMAGE_BATCH_SIZE = 8        # image batch mode: equal-sized images per detection
+
+# memory budget: fractions of the budget raising each shedding level,
+# 1: shrink queues, 2: lower resolution, 3: skip rendering
+MEM_SHED_THRESHOLDS = (0.80, 0.90, 0.95)
+MEM_SHED_HYSTERESIS = 0.05  # memory budget: margin below a threshold to lower its level
+MEM_SHED_HEIGHT = 400       # memory budget: working height when resolution is lowered
+MEM_SHED_QUEUE_SIZE = 1     # memory budget: recording queue size when queues shrink
+MEM_REPORT_EVERY = 30.      # memory budget: seconds between footprint reports
+MEM_TRACEMALLOC = False     # memory budget: trace Python allocations for reports, slow
+
+PROFILE_KEYS = ('FRAME_HEIGHT', 'DNN_INPUT_SIZE', 'FACE_CONF',
+                'FRAME_SKIP', 'NUM_THREADS', 'NUM_WORKERS')
+
+
+def loadProfile(path=PERF_PROFILE, required=False):
+    """Override pipeline's parameters by a performance profile
+
+    Arguments:
+    ----------
+        path : str
+            path to profile file written by `auto-tuner.py`
+
+    Keyword Arguments:
+    ------------------
+        required : bool (default: False)
+            whether a missing profile is an error, set for profiles
+            given explicitly by users
+
+    Returns:
+    --------
+        selected : dict
+            parameters applied from the profile, empty if no profile exists
+    """
+
+    if not os.path.isfile(path):
+        if required:
+            raise IOError('Performance profile not found: {}'.format(path) )
+        return {}
+
+    with open(path) as f:
+        selected = json.load(f).get('selected', {})
+    selected = {k: v for k, v in selected.items() if k in PROFILE_KEYS}
+    globals().update(selected)
+    return selected
+
+
+PERF_PROFILE_PARAMS = loadProfile()
 
 
 #===============================================================================
 # DEBUG MODE 
 #===============================================================================
+DEBUG_ALLOCS = False        # measure bytes allocated by each frame with tracemalloc
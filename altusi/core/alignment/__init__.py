@@ -0,0 +1 @@
+from .facealigner import FaceAligner
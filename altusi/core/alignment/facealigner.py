@@ -0,0 +1,176 @@
+"""
+FaceAligner class
+=================
+
+Class for aligning detected faces given their facial landmarks
+
+Similarity transforms of all faces in a frame are estimated at once
+from the landmark arrays, then face chips are warped into a
+preallocated buffer which is reused across frames.
+"""
+
+import numpy as np
+import cv2 as cv
+
+from altusi.configs import config as cfg
+from altusi.utils import imgproc
+from altusi.utils.logger import *
+
+# indices of (left eye, right eye, nose base) points for each landmark model,
+# eyes are given as ranges of points whose center is used; the 5-point model
+# has no nose tip, so both models anchor the nose base to give matching chips
+ANCHOR_IDXS = {
+    68: ((36, 42), (42, 48), (33, 34)),
+    5: ((2, 4), (0, 2), (4, 5)),
+}
+
+
+class FaceAligner:
+    def __init__(self, size=cfg.FACE_CHIP_SIZE,
+                 template=cfg.FACE_CHIP_TEMPLATE, capacity=8):
+        """Initialization for Face Aligner
+
+        Arguments:
+        ----------
+            size : int (default: cfg.FACE_CHIP_SIZE)
+                size of square output face chips
+            template : list(tuple(float, float) )
+                reference positions of (left eye, right eye, nose base)
+                normalized to [0, 1], the default template is custom and
+                not ArcFace-compatible (see `cfg.FACE_CHIP_TEMPLATE`)
+            capacity : int (default: 8)
+                number of faces the chip buffers are allocated for,
+                buffers are grown when a frame holds more faces
+        """
+
+        self.__size = size
+        self.__template = np.asarray(template, dtype=np.float64) * size
+
+        self.__chips = None
+        self.__grays = None
+        self.__allocate(capacity)
+
+
+    def __allocate(self, capacity):
+        """Private function for (re)allocating chip buffers"""
+
+        S = self.__size
+        self.__chips = np.empty((capacity, S, S, 3), dtype=np.uint8)
+        self.__grays = np.empty((capacity, S, S), dtype=np.float32)
+        self.__gray = np.empty((S, S), dtype=np.uint8)
+
+
+    def getAnchors(self, landmarks):
+        """Compute anchor points of faces from their landmarks
+
+        Arguments:
+        ----------
+            landmarks : numpy.array (N, P, 2) or list(list(tuple) )
+                facial points of N faces, P is 68 or 5 for every face
+
+        Returns:
+        --------
+            anchors : numpy.array (N, 3, 2)
+                (left eye, right eye, nose base) coordinates of each face
+        """
+
+        if not isinstance(landmarks, np.ndarray) \
+                and len(set(len(landmark) for landmark in landmarks) ) > 1:
+            raise ValueError('Faces hold different numbers of landmarks, '
+                             'align each group separately')
+        landmarks = np.asarray(landmarks, dtype=np.float64)
+        n_points = landmarks.shape[-2]
+        if n_points not in ANCHOR_IDXS:
+            raise ValueError('Unsupported number of landmarks: {}'.format(n_points) )
+
+        return np.stack([landmarks[..., s:e, :].mean(axis=-2)
+                         for s, e in ANCHOR_IDXS[n_points] ], axis=-2)
+
+
+    def getTransforms(self, landmarks):
+        """Estimate similarity transforms mapping faces to the chip template
+
+        Least-squares similarity (rotation, uniform scale, translation)
+        is solved in closed form for all faces at once.
+
+        Arguments:
+        ----------
+            landmarks : numpy.array (N, P, 2) or list(list(tuple) )
+                facial points of N faces
+
+        Returns:
+        --------
+            transforms : numpy.array (N, 2, 3)
+                affine matrices usable by `cv.warpAffine`
+        """
+
+        src = self.getAnchors(landmarks)
+        dst = self.__template
+
+        src_mean = src.mean(axis=1, keepdims=True)
+        dst_mean = dst.mean(axis=0)
+        p = src - src_mean
+        q = dst - dst_mean
+
+        norm = np.sum(p ** 2, axis=(1, 2) )
+        norm = np.maximum(norm, np.finfo(np.float64).eps)
+        a = np.sum(p[..., 0] * q[..., 0] + p[..., 1] * q[..., 1], axis=1) / norm
+        b = np.sum(p[..., 0] * q[..., 1] - p[..., 1] * q[..., 0], axis=1) / norm
+
+        mx, my = src_mean[:, 0, 0], src_mean[:, 0, 1]
+        transforms = np.empty((len(src), 2, 3), dtype=np.float64)
+        transforms[:, 0, 0] = a
+        transforms[:, 0, 1] = -b
+        transforms[:, 0, 2] = dst_mean[0] - (a * mx - b * my)
+        transforms[:, 1, 0] = b
+        transforms[:, 1, 1] = a
+        transforms[:, 1, 2] = dst_mean[1] - (b * mx + a * my)
+        return transforms
+
+
+    def alignFaces(self, image, landmarks, with_gray=False):
+        """Extract aligned face chips from an image
+
+        Returned arrays are views on internal buffers and are
+        overwritten by the next call, copy them to keep the chips.
+
+        Arguments:
+        ----------
+            image : numpy.array
+                input colored image
+            landmarks : numpy.array (N, P, 2) or list(list(tuple) )
+                facial points of N faces in the image, same P for every face
+
+        Keyword Arguments:
+        ------------------
+            with_gray : bool (default: False)
+                whether to also return prewhitened grayscale chips
+
+        Returns:
+        --------
+            chips : numpy.array (N, S, S, 3)
+                aligned colored face chips
+            grays : numpy.array (N, S, S)
+                prewhitened grayscale chips (only if `with_gray`)
+        """
+
+        N = len(landmarks)
+        if N > len(self.__chips):
+            self.__allocate(max(N, 2 * len(self.__chips) ) )
+
+        chips = self.__chips[:N]
+        grays = self.__grays[:N]
+        if N:
+            S = self.__size
+            transforms = self.getTransforms(landmarks)
+            for i, M in enumerate(transforms):
+                cv.warpAffine(image, M, (S, S), dst=chips[i],
+                              flags=cv.INTER_LINEAR,
+                              borderMode=cv.BORDER_CONSTANT)
+                if with_gray:
+                    cv.cvtColor(chips[i], cv.COLOR_BGR2GRAY, dst=self.__gray)
+                    grays[i] = imgproc.prewhiten(self.__gray)
+
+        if with_gray:
+            return chips, grays
+        return chips
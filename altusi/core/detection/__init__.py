@@ -1,2 +1,3 @@
 from .facedetector import FaceDetector
 from .facelandmarker import FaceLandmarker
+from .detectioncache import DetectionCache
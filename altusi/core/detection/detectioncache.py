@@ -0,0 +1,300 @@
+"""
+DetectionCache class
+====================
+
+Persistent, content-addressed cache of Face detection results
+
+Results of `FaceDetector.getFaces` are stored in an SQLite database keyed
+by a digest of the source identity, the frame (index or content hash)
+and the detector's configuration, so that re-running the same footage
+skips detection entirely. SQLite's locking makes the cache safe to share
+between concurrent processes; the least recently used entries are evicted
+once the cache holds more than `max_entries` results. The number of
+entries is kept in a metadata row maintained by triggers, read within the
+flush transaction, so the bound holds across processes without scanning
+the table.
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+
+from altusi.utils.logger import *
+
+
+class DetectionCache:
+    def __init__(self, path, max_entries=1000000, flush_every=100):
+        """Initialization for Detection Cache
+
+        Arguments:
+        ----------
+            path : str
+                path to cache database, created if missing
+
+        Keyword Arguments:
+        ------------------
+            max_entries : int (default: 1000000)
+                maximum number of cached results
+            flush_every : int (default: 100)
+                number of cache operations buffered before being
+                written to the database in a single transaction
+        """
+
+        self.__max_entries = max_entries
+        self.__flush_every = flush_every
+
+        self.__conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.__conn.execute('PRAGMA journal_mode=WAL')
+        self.__conn.execute('PRAGMA synchronous=NORMAL')
+        self.__createSchema()
+        self.__n_entries = self.__countEntries()
+
+        self.__puts = {}
+        self.__touches = {}
+        self.n_hits = 0
+        self.n_misses = 0
+
+
+    def __createSchema(self):
+        """Private function for creating tables, entry count and its triggers
+
+        The count is initialized from the table once, in the transaction
+        creating the triggers which maintain it afterwards.
+        """
+
+        self.__conn.execute('BEGIN IMMEDIATE')
+        try:
+            self.__conn.execute('CREATE TABLE IF NOT EXISTS entries ('
+                                'key TEXT PRIMARY KEY, result TEXT, accessed REAL)')
+            self.__conn.execute('CREATE INDEX IF NOT EXISTS entries_accessed '
+                                'ON entries(accessed)')
+            self.__conn.execute('CREATE TABLE IF NOT EXISTS meta ('
+                                'name TEXT PRIMARY KEY, value INTEGER)')
+            self.__conn.execute("INSERT OR IGNORE INTO meta VALUES ('n_entries', "
+                                "(SELECT COUNT(*) FROM entries) )")
+            self.__conn.execute("CREATE TRIGGER IF NOT EXISTS entries_insert "
+                                "AFTER INSERT ON entries BEGIN UPDATE meta "
+                                "SET value = value + 1 WHERE name = 'n_entries'; END")
+            self.__conn.execute("CREATE TRIGGER IF NOT EXISTS entries_delete "
+                                "AFTER DELETE ON entries BEGIN UPDATE meta "
+                                "SET value = value - 1 WHERE name = 'n_entries'; END")
+            self.__conn.execute('COMMIT')
+        except Exception:
+            self.__conn.execute('ROLLBACK')
+            raise
+
+
+    def __countEntries(self):
+        """Private function for reading the entry count of the database"""
+
+        return self.__conn.execute(
+            "SELECT value FROM meta WHERE name = 'n_entries'").fetchone()[0]
+
+
+    @staticmethod
+    def getSourceId(video_link):
+        """Identify a video source by its path, size and modification time
+
+        Arguments:
+        ----------
+            video_link : str or int
+                path to video file or camera index
+
+        Returns:
+        --------
+            source_id : str
+                identity of the source, None for live sources
+                which cannot be cached
+        """
+
+        if not isinstance(video_link, str) or not os.path.isfile(video_link):
+            return None
+
+        stat = os.stat(video_link)
+        return '{}:{}:{}'.format(os.path.abspath(video_link),
+                                 stat.st_size, stat.st_mtime_ns)
+
+
+    @staticmethod
+    def getFrameHash(frame):
+        """Compute digest of a frame's content
+
+        Arguments:
+        ----------
+            frame : numpy.array
+                input frame fed to the detector
+
+        Returns:
+        --------
+            frame_hash : str
+                hexadecimal digest of the frame
+        """
+
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(str(frame.shape).encode() )
+        digest.update(frame.data if frame.flags['C_CONTIGUOUS'] else frame.tobytes() )
+        return digest.hexdigest()
+
+
+    @staticmethod
+    def makeKey(source_id, frame_key, config):
+        """Make cache key of a frame
+
+        Arguments:
+        ----------
+            source_id : str
+                identity of the video source, None when keyed by frame hash
+            frame_key : int or str
+                frame index or frame hash
+            config : dict
+                detector's configuration and every parameter
+                changing the detector's input (e.g. working height)
+
+        Returns:
+        --------
+            key : str
+                digest identifying the detection result
+        """
+
+        content = json.dumps([source_id, frame_key, config], sort_keys=True)
+        return hashlib.sha1(content.encode() ).hexdigest()
+
+
+    def get(self, key):
+        """Look up detection result of a frame
+
+        Arguments:
+        ----------
+            key : str
+                key made by `makeKey`
+
+        Returns:
+        --------
+            result : tuple(list(float), list(tuple) )
+                cached (confs, bboxes), None if missing
+        """
+
+        result = self.__puts.get(key)
+        if result is None:
+            row = self.__conn.execute('SELECT result FROM entries WHERE key=?',
+                                      (key,) ).fetchone()
+            if row is not None:
+                result = row[0]
+
+        if result is None:
+            self.n_misses += 1
+            return None
+
+        self.n_hits += 1
+        self.__touches[key] = time.time()
+        self.__flushIfNeeded()
+
+        confs, bboxes = json.loads(result)
+        return confs, [tuple(bbox) for bbox in bboxes]
+
+
+    def put(self, key, confs, bboxes):
+        """Store detection result of a frame
+
+        Arguments:
+        ----------
+            key : str
+                key made by `makeKey`
+            confs : list(float)
+                detection confidences, None for Dlib detector
+            bboxes : list(numpy.array(x, y, w, h) )
+                detected faces
+        """
+
+        if confs is not None:
+            confs = [float(conf) for conf in confs]
+        bboxes = [[int(v) for v in bbox] for bbox in bboxes]
+        self.__puts[key] = json.dumps([confs, bboxes])
+        self.__flushIfNeeded()
+
+
+    def __flushIfNeeded(self):
+        """Private function for flushing buffered operations"""
+
+        if len(self.__puts) + len(self.__touches) >= self.__flush_every:
+            self.flush()
+
+
+    def flush(self):
+        """Write buffered results and access times, then evict LRU entries"""
+
+        if not self.__puts and not self.__touches:
+            return
+
+        now = time.time()
+        self.__conn.execute('BEGIN IMMEDIATE')
+        try:
+            # upserts update existing rows in place, so that only new rows
+            # fire the insert trigger
+            self.__conn.executemany(
+                'INSERT INTO entries VALUES (?, ?, ?) ON CONFLICT(key) DO UPDATE '
+                'SET result = excluded.result, accessed = excluded.accessed',
+                [(key, result, now) for key, result in self.__puts.items()])
+            self.__conn.executemany(
+                'UPDATE entries SET accessed=? WHERE key=?',
+                [(accessed, key) for key, accessed in self.__touches.items()])
+
+            n_entries = self.__countEntries()
+            if n_entries > self.__max_entries:
+                self.__conn.execute(
+                    'DELETE FROM entries WHERE key IN (SELECT key FROM entries '
+                    'ORDER BY accessed LIMIT ?)',
+                    (n_entries - self.__max_entries,) )
+                n_entries = self.__countEntries()
+            self.__conn.execute('COMMIT')
+        except Exception:
+            self.__conn.execute('ROLLBACK')
+            raise
+
+        self.__n_entries = n_entries
+
+        self.__puts.clear()
+        self.__touches.clear()
+
+
+    def close(self):
+        """Flush buffered operations and close the database"""
+
+        self.flush()
+        self.__conn.close()
+
+
+    @property
+    def n_entries(self):
+        """Number of cached results as of the last flush"""
+
+        return self.__n_entries
+
+
+    @property
+    def nbytes(self):
+        """Approximate memory footprint in bytes
+
+        Buffered operations plus the upper bound of SQLite's page cache.
+        """
+
+        cache_size = self.__conn.execute('PRAGMA cache_size').fetchone()[0]
+        if cache_size >= 0:
+            page_size = self.__conn.execute('PRAGMA page_size').fetchone()[0]
+            cache_nbytes = cache_size * page_size
+        else:
+            cache_nbytes = -1024 * cache_size
+
+        return (cache_nbytes
+                + sum(len(key) + len(result) for key, result in self.__puts.items() )
+                + sum(len(key) + 8 for key in self.__touches) )
+
+
+    @property
+    def hit_rate(self):
+        """Ratio of lookups served from the cache"""
+
+        n_lookups = self.n_hits + self.n_misses
+        return self.n_hits / n_lookups if n_lookups else 0.
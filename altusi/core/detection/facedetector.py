@@ -5,6 +5,8 @@ FaceDetector class
 Class for Face detection using DNN from OpenCV
 """
 
+import os
+
 import numpy as np
 import cv2 as cv
 import dlib
@@ -17,7 +19,10 @@ from altusi.utils.logger import *
 class FaceDetector:
     """Class for Face detection using DNN from OpenCV and Dlib"""
 
-    def __init__(self, lib='dnn'):
+    # mean values subtracted from input of OpenCV-DNN network
+    DNN_MEAN = np.array([104., 177., 123.], dtype=np.float32)
+
+    def __init__(self, lib='dnn', input_size=None, pool=None):
         """Initialization for Face Detector
 
         Initialize DNN network given proto and model file
@@ -30,8 +35,16 @@ class FaceDetector:
                     * dnn: for OpenCV DNN Face detection
                     * dnn-ncs: OpenCV DNN with the support of NCS
                     * dlib: for Dlib Frontal Face detection
+            input_size : int (default: None)
+                size of square input of OpenCV-DNN network,
+                `cfg.DNN_INPUT_SIZE` is used if None
+            pool : BufferPool (default: None)
+                pool providing network's input buffers,
+                they are allocated every frame if None
         """
         self.__lib = lib
+        self.__input_size = input_size if input_size else cfg.DNN_INPUT_SIZE
+        self.__pool = pool
 
 
         if self.__lib == 'dlib':
@@ -47,7 +60,26 @@ class FaceDetector:
                 self.__detector.setPreferableTarget(cv.dnn.DNN_TARGET_CPU)
 
 
-    def __detectFaces_dnn(self, img, default_conf=0.8):
+    @property
+    def config(self):
+        """Configuration determining detection results of an input image"""
+
+        config = {'lib': self.__lib}
+        if self.__lib != 'dlib':
+            config['input_size'] = self.__input_size
+        return config
+
+
+    @property
+    def nbytes(self):
+        """Approximate memory footprint of the loaded model in bytes"""
+
+        if self.__lib == 'dlib':
+            return 0
+        return os.path.getsize(cfg.CV_DNN_FACE_MODEL)
+
+
+    def __detectFaces_dnn(self, img, default_conf):
         """Private function for detecting human faces from an image
 
         Inference DNN network to detect faces from the given
@@ -68,14 +100,62 @@ class FaceDetector:
                 list of detected faces from the input image
         """
         H, W = img.shape[:2]
-        resized_img = cv.resize(img, (300, 300), interpolation=cv.INTER_CUBIC)
-        blob = cv.dnn.blobFromImage(resized_img, 
-                                    1., (300, 300),
-                                    (104., 177., 123.) )
+        S = self.__input_size
+        if self.__pool is None:
+            resized_img = cv.resize(img, (S, S), interpolation=cv.INTER_CUBIC)
+            blob = cv.dnn.blobFromImage(resized_img, 
+                                        1., (S, S),
+                                        (104., 177., 123.) )
+        else:
+            resized_img = self.__pool.check('dnn_input', cv.resize(
+                img, (S, S), dst=self.__pool.get('dnn_input', (S, S, 3) ),
+                interpolation=cv.INTER_CUBIC) )
+            blob = self.__pool.get('dnn_blob', (1, 3, S, S), np.float32)
+            np.subtract(resized_img.transpose(2, 0, 1),
+                        self.DNN_MEAN[:, None, None], out=blob[0])
+        self.__detector.setInput(blob)
+        preds = self.__detector.forward()
+        preds = np.reshape(preds, preds.shape[2:] )
+        return self.__parsePreds(preds, W, H, default_conf)
+
+
+    def __detectFacesBatch_dnn(self, imgs, default_conf):
+        """Private function for detecting human faces from equal-sized images
+
+        Inference DNN network once on a batch of images
+
+        Args:
+        -----
+            imgs : list(numpy.array)
+                input images of the same size
+            default_conf : float
+                default confidence level for Face detection
+
+        Returns:
+        --------
+            results : list(tuple(list(float), list(numpy.array(x, y, w, h) ) ) )
+                confidences and detected faces of each input image
+        """
+        H, W = imgs[0].shape[:2]
+        S = self.__input_size
+        resized_imgs = [cv.resize(img, (S, S), interpolation=cv.INTER_CUBIC)
+                        for img in imgs]
+        blob = cv.dnn.blobFromImages(resized_imgs,
+                                     1., (S, S),
+                                     (104., 177., 123.), False, False)
         self.__detector.setInput(blob)
         preds = self.__detector.forward()
         preds = np.reshape(preds, preds.shape[2:] )
 
+        # first column of predictions is the index of the image in batch
+        img_idxs = preds[:, 0].astype('int')
+        return [self.__parsePreds(preds[img_idxs == i], W, H, default_conf)
+                for i in range(len(imgs) )]
+
+
+    def __parsePreds(self, preds, W, H, default_conf):
+        """Private function for converting network predictions to bounding boxes"""
+
         confs, bboxes = [], []
         for i, pred in enumerate(preds):
             conf = pred[2]
@@ -111,7 +191,7 @@ class FaceDetector:
         return [imgproc.rectangle2Rect(rectangle) for rectangle in rectangles]
 
 
-    def getFaces(self, img, default_conf=0.8):
+    def getFaces(self, img, default_conf=None):
         """Detect human faces from an input image
 
         Args:
@@ -119,7 +199,8 @@ class FaceDetector:
             img : numpy.array
                 input image
             default_conf : float
-                default confidence level for Face detection
+                default confidence level for Face detection,
+                `cfg.FACE_CONF` is used if None
                 (only applied when library is OpenCV-DNN)
         
         Returns:
@@ -133,4 +214,34 @@ class FaceDetector:
         if self.__lib == 'dlib':
             return None, self.__detectFaces_dlib(img)
         else:
+            if default_conf is None:
+                default_conf = cfg.FACE_CONF
             return self.__detectFaces_dnn(img, default_conf)
+
+
+    def getFacesBatch(self, imgs, default_conf=None):
+        """Detect human faces from a batch of equal-sized images
+
+        OpenCV-DNN network is inferred once for the whole batch,
+        Dlib detector runs on each image.
+
+        Args:
+        -----
+            imgs : list(numpy.array)
+                input images of the same size
+            default_conf : float
+                default confidence level for Face detection,
+                `cfg.FACE_CONF` is used if None
+                (only applied when library is OpenCV-DNN)
+
+        Returns:
+        --------
+            results : list(tuple(list(float), list(numpy.array(x, y, w, h) ) ) )
+                (confs, bboxes) of each input image, as by `getFaces`
+        """
+        if self.__lib == 'dlib' or not len(imgs):
+            return [self.getFaces(img, default_conf) for img in imgs]
+        else:
+            if default_conf is None:
+                default_conf = cfg.FACE_CONF
+            return self.__detectFacesBatch_dnn(imgs, default_conf)
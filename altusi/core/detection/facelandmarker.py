@@ -3,33 +3,144 @@ FaceLandmarker class
 ====================
 
 Class for Face landmark detection
+
+Several predictor models are served behind one API, callers state the
+number of facial points they need. The fast 5-point model runs by
+default and the heavy 68-point model only runs for faces which need it:
+large faces, every Kth frame or an explicit request (see
+`findLandmarksTiered`). Model files are checked when the landmarker is
+created, falling back to the 68-point model if the 5-point one is missing,
+and models are loaded on first use.
+
+Faces of crowded frames can be landmarked in parallel: predictions run
+across a thread pool when the native predictor call runs concurrently,
+or across a process pool otherwise. Parallelism is only used for frames
+holding at least `min_faces` faces and results keep the input order; in
+`auto` mode serial runs and both pools are timed on the first crowded
+frames and the fastest one is kept.
 """
 
+import os
+import time
+import threading
+import concurrent.futures
+
+import numpy as np
 import dlib
 
 from altusi.configs import config as cfg
 from altusi.utils import imgproc
 from altusi.utils.logger import *
 
+# predictors of process-pool workers, loaded once per worker and model
+_worker_model_paths = None
+_worker_predictors = {}
+
+
+def _initWorker(model_paths):
+    """Set landmark models available to a process-pool worker"""
+
+    global _worker_model_paths
+    _worker_model_paths = model_paths
+
+
+def _findLandmarksWorker(task):
+    """Locate facial landmarks of a chunk of faces in a process-pool worker"""
+
+    image, bboxes, n_points = task
+    if n_points not in _worker_predictors:
+        _worker_predictors[n_points] = dlib.shape_predictor(
+            _worker_model_paths[n_points])
+    predictor = _worker_predictors[n_points]
+
+    return [imgproc.shape2Points(predictor(image, imgproc.rect2Rectangle(bbox) ) )
+            for bbox in bboxes]
+
+
 class FaceLandmarker:
-    def __init__(self, model_path=cfg.DLIB_FACIAL_LANDMARK_MODEL):
+    def __init__(self, model_paths=None, workers=None, mode=None, min_faces=None):
         """Initialization for Face Landmarker
-        
-        Initialize predictor for locating facial landmark
+
+        Initialize predictors for locating facial landmark
 
         Arguments:
         ----------
-            model_path : str
-                path to landmark predictor model
+            model_paths : dict(int: str) (default: None)
+                paths to landmark predictor models by their number of points,
+                `cfg.DLIB_FACIAL_LANDMARK_MODELS` if None
+            workers : int (default: None)
+                number of parallel workers, `cfg.NUM_WORKERS` if None,
+                faces are landmarked serially with a single worker
+            mode : str (default: None)
+                kind of parallel workers, `cfg.LANDMARK_POOL` if None
+                    * thread: thread pool
+                    * process: process pool
+                    * auto: fastest of serial runs, thread pool and process
+                      pool on the first `cfg.LANDMARK_CALIBRATE_FRAMES`
+                      crowded frames
+            min_faces : int (default: None)
+                minimum number of faces in a frame to use parallel workers,
+                `cfg.LANDMARK_MIN_FACES` if None
+        """
+
+        self.__model_paths = self.__checkModels(
+            model_paths if model_paths else cfg.DLIB_FACIAL_LANDMARK_MODELS)
+        self.__predictors = {}
+
+        self.__n_points = cfg.LANDMARK_POINTS
+        if self.__n_points not in self.__model_paths:
+            self.__n_points = 68 if 68 in self.__model_paths \
+                                else min(self.__model_paths)
+            LOG(ERROR, 'Falling back to {}-point landmarks by default'.format(
+                self.__n_points) )
+
+        self.__workers = workers if workers else cfg.NUM_WORKERS
+        self.__mode = mode if mode else cfg.LANDMARK_POOL
+        self.__min_faces = min_faces if min_faces else cfg.LANDMARK_MIN_FACES
+        self.__executors = {}
+        self.__calib_frames = 0
+        self.__calib_times = {'serial': 0., 'thread': 0., 'process': 0.}
+
+        # number of faces and time spent by each model in tiered landmarking
+        self.__n_faces = {5: 0, 68: 0}
+        self.__times = {5: 0., 68: 0.}
+
+
+    @staticmethod
+    def __checkModels(model_paths):
+        """Private function for keeping models whose file exists
+
+        Raises IOError if no model file exists.
         """
 
-        self.__predictor = dlib.shape_predictor(model_path)
+        available = {}
+        for n_points, path in model_paths.items():
+            if os.path.isfile(path):
+                available[n_points] = path
+            else:
+                LOG(ERROR, 'Missing {}-point landmark model:'.format(n_points), path)
+        if not available:
+            raise IOError('No landmark model found: {}'.format(
+                ', '.join(model_paths.values() ) ) )
+        return available
 
 
-    def findLandmark(self, image, bbox):
+    def __getPredictor(self, n_points):
+        """Private function for loading a predictor model on first use"""
+
+        if n_points not in self.__predictors:
+            if n_points not in self.__model_paths:
+                raise ValueError('No landmark model with {} points'.format(n_points) )
+            LOG(INFO, 'Loading {}-point landmark model'.format(n_points) )
+            self.__predictors[n_points] = dlib.shape_predictor(
+                self.__model_paths[n_points])
+        return self.__predictors[n_points]
+
+
+    def findLandmark(self, image, bbox, n_points=None):
         """Locate facial landmark from a detected face in an image
-        
-        Given an image and a bounding box of a detected face, 
+
+        Given an image and a bounding box of a detected face,
         return a list of facial points corresponding to the input face.
         Each point is represented by a tuple.
 
@@ -39,6 +150,9 @@ class FaceLandmarker:
                 input colored image for locating facial landmark
             bbox : np.array([x, y, w, h] )
                 face's bounding box
+            n_points : int (default: None)
+                number of facial points, `cfg.LANDMARK_POINTS` if None
+                and its model exists, 68 otherwise
 
         Returns:
         --------
@@ -46,16 +160,17 @@ class FaceLandmarker:
                 List of facial points' coordinates
         """
 
+        predictor = self.__getPredictor(n_points if n_points else self.__n_points)
         rect = imgproc.rect2Rectangle(bbox)
-        shape = self.__predictor(image, rect)
+        shape = predictor(image, rect)
         landmark = imgproc.shape2Points(shape)
         return landmark
 
 
-    def findLandmarks(self, image, bboxes):
+    def findLandmarks(self, image, bboxes, n_points=None):
         """Locate facial landmarks from detected faces in an image
 
-        Given an image and a bounding box of detected faces, 
+        Given an image and a bounding box of detected faces,
         return a list of facial points corresponding to each input face.
         Each point is represented by a tuple.
 
@@ -65,6 +180,9 @@ class FaceLandmarker:
                 input colored image for locating facial landmarks
             faces : list(np.array([x, y, w, h] ) )
                 list of faces' bounding boxes
+            n_points : int (default: None)
+                number of facial points, `cfg.LANDMARK_POINTS` if None
+                and its model exists, 68 otherwise
 
         Returns:
         --------
@@ -72,8 +190,197 @@ class FaceLandmarker:
                 list of List of facial points' coordinates
         """
 
+        n_points = n_points if n_points else self.__n_points
+        if self.__workers > 1 and self.__mode != 'serial' \
+                and len(bboxes) >= self.__min_faces:
+            return self.__findLandmarks_parallel(image, bboxes, n_points)
+
         landmarks = []
         for bbox in bboxes:
-            landmark = self.findLandmark(image, bbox)
+            landmark = self.findLandmark(image, bbox, n_points)
             landmarks.append(landmark)
         return landmarks
+
+
+    def findLandmarksTiered(self, image, bboxes, frame_idx=None, needs=None):
+        """Locate facial landmarks with the fast model, upgrading faces on demand
+
+        A face is landmarked with the 68-point model if it is explicitly
+        requested, if its height reaches `cfg.LANDMARK_UPGRADE_SIZE` or
+        if `frame_idx` is a multiple of `cfg.LANDMARK_UPGRADE_EVERY`;
+        other faces are landmarked with the 5-point model.
+
+        Arguments:
+        ----------
+            image : numpy.array
+                input colored image for locating facial landmarks
+            bboxes : list(np.array([x, y, w, h] ) )
+                list of faces' bounding boxes
+            frame_idx : int (default: None)
+                index of the frame, used for periodic upgrades
+            needs : bool or list(bool) (default: None)
+                whether 68 points are needed for all faces or for each face
+
+        Returns:
+        --------
+            landmarks: list(list(tuple) )
+                list of List of facial points' coordinates, holding 5 or
+                68 points each; faces with different numbers of points
+                cannot be stacked into one array, group them by
+                `len(landmark)` before `FaceAligner.alignFaces` or
+                `geometry.packLandmarks`
+        """
+
+        if needs is None or isinstance(needs, bool):
+            needs = [bool(needs)] * len(bboxes)
+        every = cfg.LANDMARK_UPGRADE_EVERY
+        upgrade_frame = frame_idx is not None and every > 0 and frame_idx % every == 0
+
+        # a missing model leaves its faces to the other tier
+        fast = 5 if 5 in self.__model_paths else self.__n_points
+        full = 68 if 68 in self.__model_paths else fast
+
+        tiers = {}
+        for i, (bbox, need) in enumerate(zip(bboxes, needs) ):
+            if need or upgrade_frame or bbox[3] >= cfg.LANDMARK_UPGRADE_SIZE:
+                tiers.setdefault(full, []).append(i)
+            else:
+                tiers.setdefault(fast, []).append(i)
+
+        landmarks = [None] * len(bboxes)
+        for n_points, idxs in tiers.items():
+            if not idxs: continue
+
+            # model loading is not charged to landmarking time
+            self.__getPredictor(n_points)
+            _start_t = time.time()
+            tier_landmarks = self.findLandmarks(image, [bboxes[i] for i in idxs],
+                                                n_points)
+            self.__times[n_points] += time.time() - _start_t
+            self.__n_faces[n_points] += len(idxs)
+
+            for i, landmark in zip(idxs, tier_landmarks):
+                landmarks[i] = landmark
+        return landmarks
+
+
+    @property
+    def stats(self):
+        """Faces and time of each model in tiered landmarking
+
+        `saved_time` estimates the time saved by running the 5-point model
+        instead of the 68-point model, once both models have run.
+        """
+
+        stats = {}
+        for n_points in self.__n_faces:
+            stats['faces_{}'.format(n_points)] = self.__n_faces[n_points]
+            stats['time_{}'.format(n_points)] = self.__times[n_points]
+
+        if self.__n_faces.get(5) and self.__n_faces.get(68):
+            t_5 = self.__times[5] / self.__n_faces[5]
+            t_68 = self.__times[68] / self.__n_faces[68]
+            stats['saved_time'] = self.__n_faces[5] * (t_68 - t_5)
+        return stats
+
+
+    @property
+    def nbytes(self):
+        """Approximate memory footprint of the loaded models in bytes
+
+        Models loaded by workers of a process pool live in the workers'
+        memory and are not counted.
+        """
+
+        return sum(os.path.getsize(self.__model_paths[n_points])
+                   for n_points in self.__predictors)
+
+
+    def __findLandmarks_parallel(self, image, bboxes, n_points, mode=None):
+        """Private function for locating facial landmarks with parallel workers"""
+
+        mode = mode if mode else self.__mode
+        if mode == 'auto':
+            return self.__calibrate(image, bboxes, n_points)
+
+        executor = self.__getExecutor(mode)
+        if mode == 'thread':
+            # load the model before threads share it
+            self.__getPredictor(n_points)
+            return list(executor.map(lambda bbox: self.findLandmark(image, bbox, n_points),
+                                     bboxes) )
+
+        # one task per worker, each sends the image once
+        chunks = np.array_split(np.arange(len(bboxes) ),
+                                min(self.__workers, len(bboxes) ) )
+        tasks = [(image, [tuple(bboxes[i]) for i in chunk], n_points)
+                 for chunk in chunks]
+        landmarks = []
+        for chunk_landmarks in executor.map(_findLandmarksWorker, tasks):
+            landmarks.extend(chunk_landmarks)
+        return landmarks
+
+
+    def __calibrate(self, image, bboxes, n_points):
+        """Private function for choosing between serial runs and worker pools
+
+        Serial, thread-pool and process-pool runs are timed on the same faces
+        of the first `cfg.LANDMARK_CALIBRATE_FRAMES` crowded frames, the
+        fastest is kept: thread pool only pays off if the native predictor
+        actually runs concurrently, process pool only if predictions outweigh
+        sending images to workers.
+        """
+
+        self.__getPredictor(n_points)
+        if not self.__executors:
+            # start every pool thread, and load the model in every pool
+            # process, before timing
+            barrier = threading.Barrier(self.__workers)
+            list(self.__getExecutor('thread').map(lambda _: barrier.wait(),
+                                                  range(self.__workers) ) )
+            list(self.__getExecutor('process').map(_findLandmarksWorker,
+                [(image, [tuple(bboxes[0])], n_points)] * self.__workers) )
+
+        _start_t = time.time()
+        landmarks = [self.findLandmark(image, bbox, n_points) for bbox in bboxes]
+        self.__calib_times['serial'] += time.time() - _start_t
+
+        for mode in ('thread', 'process'):
+            _start_t = time.time()
+            self.__findLandmarks_parallel(image, bboxes, n_points, mode)
+            self.__calib_times[mode] += time.time() - _start_t
+
+        self.__calib_frames += 1
+        if self.__calib_frames < cfg.LANDMARK_CALIBRATE_FRAMES:
+            return landmarks
+
+        self.__mode = min(self.__calib_times, key=self.__calib_times.get)
+        for mode in list(self.__executors):
+            if mode != self.__mode:
+                self.__executors.pop(mode).shutdown()
+        LOG(INFO, 'Landmarking over {} frames: serial {:.3f}s - thread pool {:.3f}s - process pool {:.3f}s - using {}'.format(
+            self.__calib_frames, self.__calib_times['serial'],
+            self.__calib_times['thread'], self.__calib_times['process'], self.__mode) )
+        return landmarks
+
+
+    def __getExecutor(self, mode):
+        """Private function for creating a worker pool on first use"""
+
+        if mode not in self.__executors:
+            if mode == 'thread':
+                self.__executors[mode] = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.__workers)
+            else:
+                self.__executors[mode] = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.__workers,
+                    initializer=_initWorker, initargs=(self.__model_paths,) )
+        return self.__executors[mode]
+
+
+    def close(self):
+        """Shut down parallel workers"""
+
+        for executor in self.__executors.values():
+            executor.shutdown()
+        self.__executors.clear()
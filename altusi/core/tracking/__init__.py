@@ -0,0 +1 @@
+from .keyframetracker import KeyframeTracker
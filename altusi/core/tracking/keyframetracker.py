@@ -0,0 +1,297 @@
+"""
+KeyframeTracker class
+=====================
+
+Class for offline landmark tracking with keyframe inference
+
+Face detection and 68-point landmarking only run on keyframes, chosen
+adaptively: a keyframe is taken once the accumulated motion since the
+previous keyframe exceeds a budget, or once the gap reaches `max_gap`
+frames. Faces of consecutive keyframes are matched by their bounding
+boxes and the landmarks of in-between frames are filled by vectorized
+linear interpolation, optionally followed by exponential smoothing.
+Occasional check frames run full inference to estimate the error of
+interpolated landmarks.
+"""
+
+import numpy as np
+import cv2 as cv
+
+from altusi.configs import config as cfg
+from altusi.utils import imgproc, geometry
+from altusi.utils.logger import *
+
+
+class KeyframeTracker:
+    def __init__(self, face_detector, face_landmarker, min_gap=None,
+                 max_gap=None, motion=None, check_every=None, smooth=None):
+        """Initialization for Keyframe Tracker
+
+        Arguments:
+        ----------
+            face_detector : FaceDetector
+                detector run on keyframes
+            face_landmarker : FaceLandmarker
+                landmarker run on keyframes
+
+        Keyword Arguments:
+        ------------------
+            min_gap : int (default: None)
+                minimum number of frames between keyframes,
+                `cfg.KEYFRAME_MIN_GAP` if None
+            max_gap : int (default: None)
+                maximum number of frames between keyframes,
+                `cfg.KEYFRAME_MAX_GAP` if None
+            motion : float (default: None)
+                budget of accumulated motion (mean absolute difference of
+                consecutive downscaled gray frames) triggering a keyframe,
+                `cfg.KEYFRAME_MOTION` if None
+            check_every : int (default: None)
+                run full inference on every Nth in-between frame to
+                estimate interpolation error, 0 disables checks,
+                `cfg.KEYFRAME_CHECK_EVERY` if None
+            smooth : float (default: None)
+                weight of the current frame in exponential smoothing of
+                landmarks, 1 disables smoothing, `cfg.KEYFRAME_SMOOTH` if None
+        """
+
+        self.__face_detector = face_detector
+        self.__face_landmarker = face_landmarker
+
+        self.__min_gap = min_gap if min_gap else cfg.KEYFRAME_MIN_GAP
+        self.__max_gap = max_gap if max_gap else cfg.KEYFRAME_MAX_GAP
+        self.__motion = motion if motion else cfg.KEYFRAME_MOTION
+        self.__check_every = cfg.KEYFRAME_CHECK_EVERY if check_every is None else check_every
+        self.__smooth = smooth if smooth else cfg.KEYFRAME_SMOOTH
+
+        self.__small = None
+        self.__prv_small = None
+        self.__last = None
+        self.__n_ids = 0
+        self.__ema = {}
+
+        self.__stats = {'frames': 0, 'keyframes': 0, 'checks': 0,
+                        'check_faces': 0, 'missed': 0}
+        self.__errors = []
+
+
+    def track(self, frames):
+        """Track facial landmarks over a sequence of frames
+
+        Arguments:
+        ----------
+            frames : iterable(numpy.array)
+                input colored frames
+
+        Returns:
+        --------
+            generator of tuple(int, numpy.array, numpy.array)
+                (frame index, face ids (N,), landmarks (N, 68, 2) ) of every
+                frame in order, faces are sorted by their ids
+        """
+
+        prv_key = None
+        pending, checks = [], {}
+        motion = 0.
+
+        for idx, frame in enumerate(frames):
+            self.__stats['frames'] += 1
+            motion += self.__getMotion(frame)
+
+            gap = idx - prv_key['idx'] if prv_key else self.__max_gap
+            if gap >= self.__max_gap or (gap >= self.__min_gap and motion >= self.__motion):
+                key = self.__inferKeyframe(idx, frame, prv_key)
+                if prv_key:
+                    yield from self.__fill(prv_key, key, pending, checks)
+                yield self.__emit(idx, key['ids'], key['landmarks'])
+
+                prv_key, pending, checks, motion = key, [], {}, 0.
+            else:
+                pending.append(idx)
+                if self.__check_every and idx % self.__check_every == 0:
+                    checks[idx] = self.__infer(frame)
+                    self.__stats['checks'] += 1
+
+                if self.__last is None or self.__last.shape != frame.shape:
+                    self.__last = np.empty_like(frame)
+                np.copyto(self.__last, frame)
+
+        # the last frame closes the final gap
+        if pending:
+            idx = pending.pop()
+            checks.pop(idx, None)
+            key = self.__inferKeyframe(idx, self.__last, prv_key)
+            yield from self.__fill(prv_key, key, pending, checks)
+            yield self.__emit(idx, key['ids'], key['landmarks'])
+
+
+    def __getMotion(self, frame):
+        """Private function for measuring motion from the previous frame"""
+
+        H, W = frame.shape[:2]
+        size = (64, max(1, int(64. * H / W) ) )
+        if self.__small is None or self.__small.shape != size[::-1]:
+            self.__small = np.empty(size[::-1], dtype=np.uint8)
+            self.__prv_small = None
+            self.__gray = np.empty(frame.shape[:2], dtype=np.uint8)
+
+        self.__gray = cv.cvtColor(frame, cv.COLOR_BGR2GRAY, dst=self.__gray)
+        cv.resize(self.__gray, size, dst=self.__small, interpolation=cv.INTER_AREA)
+        if self.__prv_small is None:
+            self.__prv_small = self.__small.copy()
+            return 0.
+
+        motion = cv.norm(self.__small, self.__prv_small, cv.NORM_L1) / self.__small.size
+        self.__small, self.__prv_small = self.__prv_small, self.__small
+        return motion
+
+
+    def __infer(self, frame):
+        """Private function for running full inference on a frame"""
+
+        _, bboxes = self.__face_detector.getFaces(frame)
+        landmarks = self.__face_landmarker.findLandmarks(frame, bboxes, 68)
+        return {
+            'bboxes': np.array(bboxes, dtype=np.float64).reshape(-1, 4),
+            'landmarks': np.array(landmarks, dtype=np.float32).reshape(-1, 68, 2)
+        }
+
+
+    def __inferKeyframe(self, idx, frame, prv_key):
+        """Private function for inferring a keyframe and identifying its faces"""
+
+        key = self.__infer(frame)
+        key['idx'] = idx
+        self.__stats['keyframes'] += 1
+
+        ids = np.empty(len(key['bboxes']), dtype=np.int64)
+        matched = np.zeros(len(ids), dtype=bool)
+        if prv_key:
+            for i, j in self.__match(prv_key['bboxes'], key['bboxes']):
+                ids[j] = prv_key['ids'][i]
+                matched[j] = True
+
+        n_new = int(np.sum(~matched) )
+        ids[~matched] = np.arange(self.__n_ids, self.__n_ids + n_new)
+        self.__n_ids += n_new
+        key['ids'] = ids
+        return key
+
+
+    @staticmethod
+    def __match(bboxes_a, bboxes_b, iou_thresh=0.3):
+        """Private function for greedily matching boxes by decreasing IoU"""
+
+        if not len(bboxes_a) or not len(bboxes_b):
+            return []
+
+        ious = imgproc.getIoUs(bboxes_a, bboxes_b)
+        used_a = np.zeros(len(bboxes_a), dtype=bool)
+        used_b = np.zeros(len(bboxes_b), dtype=bool)
+        pairs = []
+        for flat in np.argsort(-ious, axis=None):
+            i, j = np.unravel_index(flat, ious.shape)
+            if ious[i, j] < iou_thresh: break
+            if used_a[i] or used_b[j]: continue
+            used_a[i] = used_b[j] = True
+            pairs.append((i, j) )
+        return pairs
+
+
+    def __fill(self, prv_key, key, pending, checks):
+        """Private function for interpolating frames between 2 keyframes"""
+
+        if not pending:
+            return
+
+        alphas = (np.array(pending, dtype=np.float32) - prv_key['idx']) \
+                    / (key['idx'] - prv_key['idx'])
+
+        pairs = self.__match(prv_key['bboxes'], key['bboxes'])
+        idxs_a = np.array([i for i, _ in pairs], dtype=np.int64)
+        idxs_b = np.array([j for _, j in pairs], dtype=np.int64)
+        A = prv_key['landmarks'][idxs_a]
+        B = key['landmarks'][idxs_b]
+        interps = A[None] + alphas[:, None, None, None] * (B - A)[None]
+
+        # unmatched faces are held until half of the gap
+        gone = np.setdiff1d(np.arange(len(prv_key['ids']) ), idxs_a)
+        born = np.setdiff1d(np.arange(len(key['ids']) ), idxs_b)
+        matched_ids = key['ids'][idxs_b]
+
+        for t, (idx, alpha) in enumerate(zip(pending, alphas) ):
+            if alpha < 0.5:
+                ids = np.concatenate([matched_ids, prv_key['ids'][gone] ])
+                landmarks = np.concatenate([interps[t], prv_key['landmarks'][gone] ])
+            else:
+                ids = np.concatenate([matched_ids, key['ids'][born] ])
+                landmarks = np.concatenate([interps[t], key['landmarks'][born] ])
+
+            if idx in checks:
+                self.__checkError(checks[idx], landmarks)
+            yield self.__emit(idx, ids, landmarks)
+
+
+    def __checkError(self, check, landmarks):
+        """Private function for measuring error of interpolated landmarks
+
+        Errors are mean point distances normalized by inter-ocular distance.
+        """
+
+        ref = check['landmarks']
+        self.__stats['check_faces'] += len(ref)
+        if not len(ref):
+            return
+
+        if len(landmarks):
+            pairs = self.__match(self.__getExtents(ref), self.__getExtents(landmarks) )
+        else:
+            pairs = []
+        self.__stats['missed'] += len(ref) - len(pairs)
+        if not pairs:
+            return
+
+        idxs_ref, idxs = np.array(pairs).T
+        dists = np.sqrt(np.sum(np.square(ref[idxs_ref] - landmarks[idxs]), axis=-1) )
+        iods = geometry.getFaceSize(ref[idxs_ref])[:, 2]
+        self.__errors.extend(dists.mean(axis=-1) / np.maximum(iods, 1e-6) )
+
+
+    @staticmethod
+    def __getExtents(landmarks):
+        """Private function for computing bounding boxes of landmarks"""
+
+        mins = landmarks.min(axis=1)
+        return np.concatenate([mins, landmarks.max(axis=1) - mins], axis=1)
+
+
+    def __emit(self, idx, ids, landmarks):
+        """Private function for smoothing and sorting landmarks of a frame"""
+
+        order = np.argsort(ids)
+        ids, landmarks = ids[order], landmarks[order]
+
+        if self.__smooth < 1 and len(ids):
+            prvs = np.stack([self.__ema.get(i, landmark)
+                             for i, landmark in zip(ids, landmarks)])
+            landmarks = self.__smooth * landmarks + (1 - self.__smooth) * prvs
+        self.__ema = dict(zip(ids, landmarks) )
+
+        return idx, ids, landmarks
+
+
+    @property
+    def stats(self):
+        """Counts of frames, keyframes and check frames, and check errors
+
+        `cost` is the ratio of frames running full inference, `mean_error`
+        and `max_error` are normalized by inter-ocular distance.
+        """
+
+        stats = dict(self.__stats)
+        n_frames = max(stats['frames'], 1)
+        stats['cost'] = (stats['keyframes'] + stats['checks']) / n_frames
+        if self.__errors:
+            stats['mean_error'] = float(np.mean(self.__errors) )
+            stats['max_error'] = float(np.max(self.__errors) )
+        return stats
@@ -34,7 +34,236 @@ def getArgs():
     parser.add_argument('--lib', '-l', type=str,
                         default='dnn', required=False,
                         help='name of face detector in use')
+    parser.add_argument('--profile', '-p', type=str,
+                        default=None, required=False,
+                        help='path to performance profile written by auto-tuner.py')
+    parser.add_argument('--cache', '-c', type=str,
+                        default=None, required=False,
+                        help='path to detection cache database')
+    parser.add_argument('--cache_key', type=str,
+                        default='index', required=False,
+                        choices=['index', 'hash'],
+                        help='key cached detections by frame index or frame hash')
+    parser.add_argument('--record', '-r',
+                        default=False, required=False,
+                        action='store_true',
+                        help='record annotated video to <NAME>.avi')
+    parser.add_argument('--record_height', type=int,
+                        default=None, required=False,
+                        help='height of recorded frames')
+    parser.add_argument('--record_every', type=int,
+                        default=1, required=False,
+                        help='record one processed frame out of every N frames')
+    parser.add_argument('--codec', type=str,
+                        default=None, required=False,
+                        help='FourCC code of recording encoder')
+    parser.add_argument('--record_policy', type=str,
+                        default=None, required=False,
+                        choices=['drop', 'block'],
+                        help='drop frames or block when the encoder lags')
+    parser.add_argument('--index', '-x', type=str,
+                        default=None, required=False,
+                        help='path to output face-occurrence index (.npz)')
+    parser.add_argument('--mem_budget', '-m', type=float,
+                        default=None, required=False,
+                        help='memory budget in MB, load is shed when close to it')
+    parser.add_argument('--mem_trace',
+                        default=False, required=False,
+                        action='store_true',
+                        help='log top tracemalloc allocation sites in memory reports')
 
     args = parser.parse_args()
 
     return args 
+
+
+def getTunerArgs():
+    """Argument collecting and parsing for the auto-tuner
+
+    Returns:
+    --------
+        args : argparse object 
+            arguments after parsing
+    """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--video', '-v', type=str,
+                        required=True,
+                        help='path to sample video used for tuning')
+    parser.add_argument('--lib', '-l', type=str,
+                        default='dnn', required=False,
+                        help='name of face detector in use')
+    parser.add_argument('--frames', '-f', type=int,
+                        default=90, required=False,
+                        help='number of video frames used for each trial')
+    parser.add_argument('--heights', type=int, nargs='+',
+                        default=[600, 480, 360], required=False,
+                        help='candidate working heights of frames')
+    parser.add_argument('--input_sizes', type=int, nargs='+',
+                        default=[300, 240, 180], required=False,
+                        help='candidate input sizes of OpenCV-DNN detector')
+    parser.add_argument('--confs', type=float, nargs='+',
+                        default=[0.8, 0.6, 0.5], required=False,
+                        help='candidate confidence thresholds')
+    parser.add_argument('--skips', type=int, nargs='+',
+                        default=[1, 2, 3, 4], required=False,
+                        help='candidate frame skips')
+    parser.add_argument('--threads', type=int, nargs='+',
+                        default=None, required=False,
+                        help='candidate OpenCV thread counts (default: 1..#CPUs)')
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=None, required=False,
+                        help='candidate landmarking worker counts (default: 1 and #CPUs)')
+    parser.add_argument('--min_recall', type=float,
+                        default=0.9, required=False,
+                        help='minimum recall of the selected configuration')
+    parser.add_argument('--output', '-o', type=str,
+                        default=None, required=False,
+                        help='path to output performance profile')
+
+    args = parser.parse_args()
+
+    return args
+
+
+def getBenchmarkArgs():
+    """Argument collecting and parsing for the landmarking benchmark
+
+    Returns:
+    --------
+        args : argparse object 
+            arguments after parsing
+    """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--image', '-i', type=str,
+                        required=True,
+                        help='path to image holding at least one face')
+    parser.add_argument('--lib', '-l', type=str,
+                        default='dnn', required=False,
+                        help='name of face detector in use')
+    parser.add_argument('--faces', type=int, nargs='+',
+                        default=[1, 2, 4, 8, 16, 32], required=False,
+                        help='face counts to benchmark')
+    parser.add_argument('--workers', '-w', type=int,
+                        default=None, required=False,
+                        help='number of parallel workers (default: #CPUs)')
+    parser.add_argument('--points', '-p', type=int,
+                        default=68, required=False,
+                        help='number of facial points (5 or 68)')
+    parser.add_argument('--iters', type=int,
+                        default=10, required=False,
+                        help='number of timed runs for each face count')
+
+    args = parser.parse_args()
+
+    return args
+
+
+def getOfflineArgs():
+    """Argument collecting and parsing for offline landmark tracking
+
+    Returns:
+    --------
+        args : argparse object 
+            arguments after parsing
+    """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--video', '-v', type=str,
+                        required=True,
+                        help='path to recorded video')
+    parser.add_argument('--lib', '-l', type=str,
+                        default='dnn', required=False,
+                        help='name of face detector in use')
+    parser.add_argument('--output', '-o', type=str,
+                        default=None, required=False,
+                        help='path to output landmarks file (default: <VIDEO>.npz)')
+    parser.add_argument('--min_gap', type=int,
+                        default=None, required=False,
+                        help='minimum number of frames between keyframes')
+    parser.add_argument('--max_gap', type=int,
+                        default=None, required=False,
+                        help='maximum number of frames between keyframes')
+    parser.add_argument('--motion', type=float,
+                        default=None, required=False,
+                        help='accumulated motion triggering a keyframe')
+    parser.add_argument('--check_every', type=int,
+                        default=None, required=False,
+                        help='run full inference every N frames to estimate error')
+    parser.add_argument('--smooth', type=float,
+                        default=None, required=False,
+                        help='smoothing weight of the current frame (1: no smoothing)')
+
+    args = parser.parse_args()
+
+    return args
+
+
+def getImagesArgs():
+    """Argument collecting and parsing for image batch mode
+
+    Returns:
+    --------
+        args : argparse object 
+            arguments after parsing
+    """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--images', '-i', type=str,
+                        required=True,
+                        help='image directory or glob pattern (quoted)')
+    parser.add_argument('--lib', '-l', type=str,
+                        default='dnn', required=False,
+                        help='name of face detector in use')
+    parser.add_argument('--output', '-o', type=str,
+                        default='landmarks.jsonl', required=False,
+                        help='path to output JSON-lines file')
+    parser.add_argument('--points', '-p', type=int,
+                        default=None, required=False,
+                        help='number of facial points (5 or 68)')
+    parser.add_argument('--batch_size', '-b', type=int,
+                        default=None, required=False,
+                        help='number of equal-sized images detected at once')
+    parser.add_argument('--workers', '-w', type=int,
+                        default=None, required=False,
+                        help='number of decoding threads (default: #CPUs)')
+    parser.add_argument('--prefetch', type=int,
+                        default=None, required=False,
+                        help='number of images decoded ahead of inference')
+
+    args = parser.parse_args()
+
+    return args
+
+
+def getIndexArgs():
+    """Argument collecting and parsing for face-occurrence index queries
+
+    Returns:
+    --------
+        args : argparse object 
+            arguments after parsing
+    """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--index', '-x', type=str,
+                        required=True,
+                        help='path to face-occurrence index (.npz)')
+    parser.add_argument('--query', '-q', type=str,
+                        default='intervals', required=False,
+                        choices=['intervals', 'count', 'first'],
+                        help='time ranges with faces, face counts or first appearance')
+    parser.add_argument('--start', type=float,
+                        default=None, required=False,
+                        help='start of queried range in seconds')
+    parser.add_argument('--end', type=float,
+                        default=None, required=False,
+                        help='end of queried range in seconds')
+    parser.add_argument('--min_faces', type=int,
+                        default=1, required=False,
+                        help='minimum number of faces')
+
+    args = parser.parse_args()
+
+    return args
@@ -0,0 +1,151 @@
+"""
+BufferPool class
+================
+
+Pool of named, preallocated arrays reused across frames
+
+Stages of the pipeline request their output arrays from the pool and
+pass them as `dst=` to OpenCV functions, so that full-frame arrays are
+only allocated while warming up or when a frame's size changes.
+
+Allocations are counted per frame to verify steady-state operation:
+pool misses, outputs returned by a stage instead of its pooled buffer
+(an OpenCV function quietly allocating when `dst` does not match, see
+`check`) and, in trace mode, the peak of bytes allocated by the frame
+as seen by `tracemalloc`, which also covers arrays allocated outside
+the pool such as network outputs.
+"""
+
+import tracemalloc
+
+import numpy as np
+
+from altusi.utils.logger import *
+
+
+class BufferPool:
+    def __init__(self, trace=False):
+        """Initialization for Buffer Pool
+
+        Keyword Arguments:
+        ------------------
+            trace : bool (default: False)
+                whether to measure bytes allocated by each frame with
+                `tracemalloc`, a debugging aid slowing down the pipeline
+        """
+
+        self.__buffers = {}
+        self.__n_allocs = 0
+        self.__frame_allocs = 0
+
+        self.__trace = trace
+        self.__frame_start = 0
+        self.__frame_nbytes = None
+        if self.__trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+
+    def get(self, name, shape, dtype=np.uint8):
+        """Get a buffer, allocating it only if missing or mismatched
+
+        Arguments:
+        ----------
+            name : str
+                name of the buffer, unique for each stage using it
+            shape : tuple(int)
+                expected shape of the buffer
+
+        Keyword Arguments:
+        ------------------
+            dtype : numpy.dtype (default: numpy.uint8)
+                expected data type of the buffer
+
+        Returns:
+        --------
+            buffer : numpy.array
+                buffer of the requested shape and data type,
+                its content is left from the previous use
+        """
+
+        shape = tuple(shape)
+        buffer = self.__buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self.__buffers[name] = buffer
+            self.__n_allocs += 1
+            self.__frame_allocs += 1
+        return buffer
+
+
+    def check(self, name, array):
+        """Check that a stage wrote its output into its pooled buffer
+
+        An output which is not the pooled buffer was allocated by the
+        stage itself and is counted as an allocation of the frame.
+
+        Arguments:
+        ----------
+            name : str
+                name of the buffer passed as `dst` to the stage
+            array : numpy.array
+                output returned by the stage
+
+        Returns:
+        --------
+            array : numpy.array
+                the output, unchanged
+        """
+
+        if array is not self.__buffers.get(name):
+            self.__n_allocs += 1
+            self.__frame_allocs += 1
+        return array
+
+
+    def beginFrame(self):
+        """Start counting allocations of a new frame"""
+
+        self.__frame_allocs = 0
+        if self.__trace:
+            self.__frame_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+
+    def endFrame(self):
+        """Stop counting allocations of the current frame
+
+        Returns:
+        --------
+            n_allocs : int
+                number of buffers allocated since `beginFrame`, including
+                outputs which missed their pooled buffer
+        """
+
+        if self.__trace:
+            self.__frame_nbytes = tracemalloc.get_traced_memory()[1] - self.__frame_start
+        return self.__frame_allocs
+
+
+    @property
+    def n_allocs(self):
+        """Total number of buffers allocated by the pool"""
+
+        return self.__n_allocs
+
+
+    @property
+    def frame_nbytes(self):
+        """Peak of bytes allocated by the last frame, None out of trace mode
+
+        Python objects of a frame account for a few kilobytes, full-frame
+        arrays allocated outside the pool for hundreds of kilobytes.
+        """
+
+        return self.__frame_nbytes
+
+
+    @property
+    def nbytes(self):
+        """Total size in bytes of buffers held by the pool"""
+
+        return sum(buffer.nbytes for buffer in self.__buffers.values() )
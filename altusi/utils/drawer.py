@@ -7,6 +7,8 @@ Its functions are supported by OpenCV and Pillow
 
 Revision
 --------
+    2026, Oct 19:
+        - Add `dst` argument to `drawInfo` for drawing into a preallocated image
     2019, Apr 13:
         - Add functions to draw circles `drawCircle` and `drawCircles`
     2019, Apr 11:
@@ -14,6 +16,7 @@ Revision
 """
 
 import numpy as np
+import cv2 as cv
 from PIL import Image, ImageFont, ImageDraw
 
 from altusi.configs import config as cfg
@@ -174,7 +177,7 @@ def drawLabels(image, objects, labels, color=COLOR_RED, thickness=2):
     return np.asarray(image)
 
 
-def drawInfo(image, labels, color=COLOR_RED):
+def drawInfo(image, labels, color=COLOR_RED, dst=None):
     """Draw information label for an image
     
     Arguments:
@@ -188,6 +191,9 @@ def drawInfo(image, labels, color=COLOR_RED):
     ------------------
         color : tuple(B : int, G : int, R: int) (default: COLOR_RED)
             color for drawing
+        dst : numpy.array (default: None)
+            preallocated output image, may be `image` itself;
+            labels are then drawn by OpenCV without any PIL conversion
     
     Returns:
     --------
@@ -195,6 +201,9 @@ def drawInfo(image, labels, color=COLOR_RED):
             output image after drawing
     """
 
+    if dst is not None:
+        return _drawInfo_cv(image, labels, color, dst)
+
     font = ImageFont.truetype(font=cfg.FONT, \
                 size=np.floor(3e-2 * image.shape[0] + 0.5).astype('int32') )
     image = Image.fromarray(image)
@@ -215,3 +224,22 @@ def drawInfo(image, labels, color=COLOR_RED):
 
     del draw
     return np.asarray(image)
+
+
+def _drawInfo_cv(image, labels, color, dst):
+    """Private function for drawing information label in place by OpenCV"""
+
+    if dst is not image:
+        np.copyto(dst, image)
+
+    font = cv.FONT_HERSHEY_SIMPLEX
+    font_scale = 1e-3 * image.shape[0]
+    prv_y = 0
+    for label in labels:
+        (w, h), baseline = cv.getTextSize(label, font, font_scale, 1)
+        cv.rectangle(dst, (0, prv_y), (w + 1, prv_y + h + baseline + 1), color, -1)
+        cv.putText(dst, label, (0, prv_y + h), font, font_scale,
+                   COLOR_WHITE, 1, cv.LINE_AA)
+        prv_y += h + baseline + 2
+
+    return dst
@@ -0,0 +1,268 @@
+"""
+Face index library
+==================
+
+Compact sidecar index of face occurrences in a processed recording
+
+While a recording is processed, `FaceIndexWriter` stores for every
+processed frame its face count and a summary of its boxes (union box
+and largest face height, in source resolution whatever the working
+resolution of the frame), plus run-length encoded intervals of frames
+holding faces. A processed frame stands for all frames up to the next
+processed one. `FaceIndex` answers range, count and first-appearance
+queries from the index file alone, without touching the video.
+"""
+
+import array
+
+import numpy as np
+
+from altusi.utils.logger import *
+
+
+class FaceIndexWriter:
+    def __init__(self, path, fps, frame_size=None):
+        """Initialization for Face Index Writer
+
+        Arguments:
+        ----------
+            path : str
+                path to output index file (`.npz`)
+            fps : float
+                frame rate of the recording, used to convert frames to time
+
+        Keyword Arguments:
+        ------------------
+            frame_size : tuple(int, int) (default: None)
+                (W, H) of source frames, stored with the index
+        """
+
+        self.__path = path
+        self.__fps = fps if fps > 0 else 30.
+        self.__frame_size = frame_size if frame_size else (0, 0)
+
+        self.__frames = array.array('l')
+        self.__counts = array.array('H')
+        self.__boxes = array.array('l')
+        self.__max_sizes = array.array('l')
+
+
+    def add(self, frame_idx, bboxes, scale=1.):
+        """Record faces of a processed frame
+
+        Arguments:
+        ----------
+            frame_idx : int
+                index of the frame in the recording, increasing
+            bboxes : list(numpy.array(x, y, w, h) )
+                faces detected in the frame
+
+        Keyword Arguments:
+        ------------------
+            scale : float (default: 1.)
+                ratio of source to working resolution of the frame,
+                boxes are stored in source resolution
+        """
+
+        self.__frames.append(frame_idx)
+        self.__counts.append(min(len(bboxes), 0xFFFF) )
+        if len(bboxes):
+            b = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4) * scale
+            self.__boxes.extend([int(round(b[:, 0].min() ) ), int(round(b[:, 1].min() ) ),
+                                 int(round( (b[:, 0] + b[:, 2]).max() ) ),
+                                 int(round( (b[:, 1] + b[:, 3]).max() ) )])
+            self.__max_sizes.append(int(round(b[:, 3].max() ) ) )
+        else:
+            self.__boxes.extend([0, 0, 0, 0])
+            self.__max_sizes.append(0)
+
+
+    def close(self, n_frames=None):
+        """Write the index file
+
+        Keyword Arguments:
+        ------------------
+            n_frames : int (default: None)
+                number of frames of the recording,
+                the last processed frame + 1 if None
+        """
+
+        frames = np.array(self.__frames, dtype=np.int64)
+        counts = np.array(self.__counts, dtype=np.uint16)
+        if n_frames is None:
+            n_frames = int(frames[-1]) + 1 if len(frames) else 0
+
+        np.savez_compressed(
+            self.__path,
+            fps=np.float64(self.__fps),
+            frame_size=np.array(self.__frame_size, dtype=np.int64),
+            n_frames=np.int64(n_frames),
+            frames=frames,
+            counts=counts,
+            boxes=np.array(self.__boxes, dtype=np.int32).reshape(-1, 4),
+            max_sizes=np.array(self.__max_sizes, dtype=np.int32),
+            intervals=getIntervals(frames, counts, n_frames) )
+        LOG(INFO, 'Face index of {} processed frames written to'.format(len(frames) ),
+            self.__path)
+
+
+def getIntervals(frames, counts, n_frames, min_faces=1):
+    """Run-length encode frames holding enough faces
+
+    Arguments:
+    ----------
+        frames : numpy.array (K,)
+            increasing indices of processed frames
+        counts : numpy.array (K,)
+            face count of each processed frame
+        n_frames : int
+            number of frames of the recording
+
+    Keyword Arguments:
+    ------------------
+        min_faces : int (default: 1)
+            minimum face count of a frame to be included
+
+    Returns:
+    --------
+        intervals : numpy.array (M, 2)
+            [start, end) frame intervals
+    """
+
+    if not len(frames):
+        return np.zeros((0, 2), dtype=np.int64)
+
+    ends = np.append(frames[1:], max(n_frames, frames[-1] + 1) )
+    present = np.concatenate([[False], counts >= min_faces, [False] ])
+    changes = np.flatnonzero(present[1:] != present[:-1])
+    starts_k, ends_k = changes[::2], changes[1::2]
+    return np.stack([frames[starts_k], ends[ends_k - 1] ], axis=1).astype(np.int64)
+
+
+class FaceIndex:
+    def __init__(self, path):
+        """Initialization for Face Index
+
+        Arguments:
+        ----------
+            path : str
+                path to index file written by `FaceIndexWriter`
+        """
+
+        with np.load(path) as data:
+            self.fps = float(data['fps'])
+            self.n_frames = int(data['n_frames'])
+            self.frame_size = tuple(int(v) for v in data['frame_size']) \
+                                if 'frame_size' in data.files else (0, 0)
+            self.frames = data['frames']
+            self.counts = data['counts']
+            self.boxes = data['boxes']
+            self.max_sizes = data['max_sizes']
+            self.intervals = data['intervals']
+
+
+    def __toFrames(self, start, end):
+        """Private function for converting a time range to a frame range"""
+
+        start_frm = int(start * self.fps) if start is not None else 0
+        end_frm = int(np.ceil(end * self.fps) ) if end is not None else self.n_frames
+        return start_frm, end_frm
+
+
+    def getIntervals(self, start=None, end=None, min_faces=1):
+        """Get time ranges holding faces
+
+        Arguments:
+        ----------
+            start : float (default: None)
+                start of the queried range in seconds
+            end : float (default: None)
+                end of the queried range in seconds
+            min_faces : int (default: 1)
+                minimum number of faces
+
+        Returns:
+        --------
+            intervals : numpy.array (M, 2)
+                [start, end) ranges in seconds, clipped to the queried range
+        """
+
+        start_frm, end_frm = self.__toFrames(start, end)
+        return self.__getFrameIntervals(start_frm, end_frm, min_faces) / self.fps
+
+
+    def __getFrameIntervals(self, start_frm, end_frm, min_faces=1):
+        """Private function for getting frame intervals within a frame range"""
+
+        if min_faces == 1:
+            intervals = self.intervals
+        else:
+            intervals = getIntervals(self.frames, self.counts, self.n_frames, min_faces)
+
+        lo = np.searchsorted(intervals[:, 1], start_frm, side='right')
+        hi = np.searchsorted(intervals[:, 0], end_frm, side='left')
+        return np.clip(intervals[lo:hi], start_frm, end_frm)
+
+
+    def count(self, start=None, end=None):
+        """Count faces within a time range
+
+        Arguments:
+        ----------
+            start : float (default: None)
+                start of the queried range in seconds
+            end : float (default: None)
+                end of the queried range in seconds
+
+        Returns:
+        --------
+            counts : dict
+                processed frames, frames and seconds holding faces,
+                total and maximum face count, largest face height
+        """
+
+        start_frm, end_frm = self.__toFrames(start, end)
+        lo = np.searchsorted(self.frames, start_frm, side='left')
+        hi = np.searchsorted(self.frames, end_frm, side='left')
+        counts = self.counts[lo:hi]
+
+        intervals = self.__getFrameIntervals(start_frm, end_frm)
+        n_present = int(np.sum(intervals[:, 1] - intervals[:, 0]) )
+        return {
+            'processed_frames': int(hi - lo),
+            'frames_with_faces': n_present,
+            'seconds_with_faces': n_present / self.fps,
+            'faces': int(np.sum(counts, dtype=np.int64) ),
+            'max_faces': int(counts.max() ) if len(counts) else 0,
+            'max_face_size': int(self.max_sizes[lo:hi].max() ) if hi > lo else 0
+        }
+
+
+    def firstAppearance(self, after=None, min_faces=1):
+        """Find the first time faces appear
+
+        Arguments:
+        ----------
+            after : float (default: None)
+                time in seconds to search from
+            min_faces : int (default: 1)
+                minimum number of faces
+
+        Returns:
+        --------
+            time : float
+                time in seconds of the first processed frame holding
+                enough faces, None if faces never appear
+        """
+
+        start_frm, _ = self.__toFrames(after, None)
+        lo = np.searchsorted(self.frames, start_frm, side='right')
+
+        # the processed frame preceding `after` stands for it
+        if lo and self.counts[lo - 1] >= min_faces:
+            return max(self.frames[lo - 1], start_frm) / self.fps
+
+        hits = np.flatnonzero(self.counts[lo:] >= min_faces)
+        if not len(hits):
+            return None
+        return self.frames[lo + hits[0]] / self.fps
@@ -0,0 +1,355 @@
+"""
+Geometry library
+================
+
+Library to compute facial geometry from 68-point landmarks
+
+All functions accept landmark batches of shape (..., 68, 2), e.g.
+(N, 68, 2) for the faces of a frame or (F, N, 68, 2) for a recording,
+and compute their measures for all faces at once. Recordings with a
+varying number of faces per frame are padded with NaN, which propagates
+to the corresponding outputs.
+
+Revision
+--------
+    2026, Oct 19:
+        - Add distance, EAR/MAR, face size/orientation and head pose functions
+"""
+
+import numpy as np
+import cv2 as cv
+
+# point indices of 68-point landmarks
+LEFT_EYE_IDXS = (36, 37, 38, 39, 40, 41)
+RIGHT_EYE_IDXS = (42, 43, 44, 45, 46, 47)
+INNER_MOUTH_IDXS = (60, 61, 62, 63, 64, 65, 66, 67)
+
+# points used for head pose estimation and their generic 3D model coordinates
+# in camera axes convention (x right, y down, z away from camera)
+# nose tip, chin, left eye corner, right eye corner, left/right mouth corner
+HEAD_POSE_IDXS = (30, 8, 36, 45, 48, 54)
+HEAD_POSE_MODEL = np.array([
+    (0.0, 0.0, 0.0),
+    (0.0, 330.0, 65.0),
+    (-225.0, -170.0, 135.0),
+    (225.0, -170.0, 135.0),
+    (-150.0, 150.0, 125.0),
+    (150.0, 150.0, 125.0)
+], dtype=np.float64)
+
+
+#===============================================================================
+# SUPPORT FUNCTIONS
+#===============================================================================
+
+def packLandmarks(frames_landmarks, n_points=68):
+    """Pack per-frame landmarks into a NaN-padded array
+
+    Arguments:
+    ----------
+        frames_landmarks : list(list(list(tuple) ) )
+            landmarks of faces in each frame, as returned by
+            `FaceLandmarker.findLandmarks(image, bboxes, n_points)` for
+            every frame; output of `findLandmarksTiered` mixes 5- and
+            68-point faces and cannot be packed
+
+    Keyword Arguments:
+    ------------------
+        n_points : int (default: 68)
+            number of points of every face, ValueError is raised
+            if a face holds another number of points
+
+    Returns:
+    --------
+        landmarks : numpy.array (F, N, n_points, 2)
+            packed landmarks, N is the maximum number of faces in a frame
+    """
+
+    F = len(frames_landmarks)
+    N = max([len(faces) for faces in frames_landmarks] + [0])
+    landmarks = np.full((F, N, n_points, 2), np.nan, dtype=np.float32)
+    for i, faces in enumerate(frames_landmarks):
+        for j, face in enumerate(faces):
+            if len(face) != n_points:
+                raise ValueError('Face with {} points packed as {} points'.format(
+                    len(face), n_points) )
+            landmarks[i, j] = face
+    return landmarks
+
+
+def packIds(frames_ids):
+    """Pack per-frame track ids alongside landmarks packed by position
+
+    Arguments:
+    ----------
+        frames_ids : list(numpy.array)
+            non-negative track ids of faces in each frame, as yielded by
+            `KeyframeTracker.track`
+
+    Returns:
+    --------
+        ids : numpy.array (F, N)
+            track id of each packed face, -1 for padding
+    """
+
+    F = len(frames_ids)
+    N = max([len(ids) for ids in frames_ids] + [0])
+    packed = np.full((F, N), -1, dtype=np.int32)
+    for i, ids in enumerate(frames_ids):
+        packed[i, :len(ids)] = ids
+    return packed
+
+
+def getTrack(landmarks, ids, track_id):
+    """Get landmarks of one tracked face across frames
+
+    Arguments:
+    ----------
+        landmarks : numpy.array (F, N, P, 2)
+            landmarks packed by position, see `packLandmarks`
+        ids : numpy.array (F, N)
+            track ids of packed faces, see `packIds`
+        track_id : int
+            id of the face to follow
+
+    Returns:
+    --------
+        track : numpy.array (F, P, 2)
+            landmarks of the face in each frame, NaN where it is absent
+    """
+
+    track = np.full(landmarks.shape[:1] + landmarks.shape[2:], np.nan,
+                    dtype=landmarks.dtype)
+    frames, cols = np.nonzero(ids == track_id)
+    track[frames] = landmarks[frames, cols]
+    return track
+
+
+def saveLandmarks(path, landmarks, frames=None, ids=None):
+    """Save packed landmarks of a recording to a `.npz` file
+
+    Arguments:
+    ----------
+        path : str
+            output file path
+        landmarks : numpy.array (F, N, 68, 2)
+            packed landmarks, see `packLandmarks`
+
+    Keyword Arguments:
+    ------------------
+        frames : numpy.array (F,) (default: None)
+            frame indices corresponding to the landmarks
+        ids : numpy.array (F, N) (default: None)
+            track ids of packed faces, see `packIds`
+    """
+
+    if frames is None:
+        frames = np.arange(len(landmarks) )
+    arrays = {'landmarks': landmarks, 'frames': np.asarray(frames)}
+    if ids is not None:
+        arrays['ids'] = ids
+    np.savez_compressed(path, **arrays)
+
+
+def loadLandmarks(path):
+    """Load packed landmarks of a recording from a `.npz` file
+
+    Arguments:
+    ----------
+        path : str
+            input file path
+
+    Returns:
+    --------
+        frames : numpy.array (F,)
+            frame indices
+        landmarks : numpy.array (F, N, 68, 2)
+            packed landmarks
+        ids : numpy.array (F, N)
+            track ids of packed faces, None if they were not saved
+    """
+
+    with np.load(path) as data:
+        return data['frames'], data['landmarks'], \
+               data['ids'] if 'ids' in data else None
+
+
+#===============================================================================
+# GEOMETRY FUNCTIONS
+#===============================================================================
+
+def getPointDists(landmarks, idxs_a, idxs_b):
+    """Compute Euclidean distances between pairs of facial points
+
+    Arguments:
+    ----------
+        landmarks : numpy.array (..., P, 2)
+            input landmarks
+        idxs_a : list(int)
+            indices of first points of pairs
+        idxs_b : list(int)
+            indices of second points of pairs
+
+    Returns:
+    --------
+        dists : numpy.array (..., K)
+            distances of K pairs of points for each face
+    """
+
+    landmarks = np.asarray(landmarks, dtype=np.float64)
+    diffs = landmarks[..., list(idxs_a), :] - landmarks[..., list(idxs_b), :]
+    return np.sqrt(np.sum(np.square(diffs), axis=-1) )
+
+
+def getEyeAspectRatio(landmarks):
+    """Compute eye aspect ratio (EAR) of both eyes
+
+    EAR = (|p2 - p6| + |p3 - p5|) / (2 |p1 - p4|) for eye points p1..p6,
+    small values indicate closed eyes
+
+    Arguments:
+    ----------
+        landmarks : numpy.array (..., 68, 2)
+            input landmarks
+
+    Returns:
+    --------
+        ears : numpy.array (..., 2)
+            EAR of left and right eye of each face
+    """
+
+    ears = []
+    for p in (LEFT_EYE_IDXS, RIGHT_EYE_IDXS):
+        d = getPointDists(landmarks, (p[1], p[2], p[0]), (p[5], p[4], p[3]) )
+        ears.append((d[..., 0] + d[..., 1]) / (2. * d[..., 2]) )
+    return np.stack(ears, axis=-1)
+
+
+def getMouthAspectRatio(landmarks):
+    """Compute mouth aspect ratio (MAR) of the inner lips
+
+    Arguments:
+    ----------
+        landmarks : numpy.array (..., 68, 2)
+            input landmarks
+
+    Returns:
+    --------
+        mars : numpy.array (...)
+            MAR of each face, large values indicate an opened mouth
+    """
+
+    p = INNER_MOUTH_IDXS
+    d = getPointDists(landmarks, (p[1], p[2], p[3], p[0]),
+                                 (p[7], p[6], p[5], p[4]) )
+    return (d[..., 0] + d[..., 1] + d[..., 2]) / (2. * d[..., 3])
+
+
+def getFaceSize(landmarks):
+    """Compute size measures of faces
+
+    Arguments:
+    ----------
+        landmarks : numpy.array (..., P, 2)
+            input landmarks
+
+    Returns:
+    --------
+        sizes : numpy.array (..., 3)
+            width and height of landmarks' bounding box and
+            inter-ocular distance of each face
+    """
+
+    landmarks = np.asarray(landmarks, dtype=np.float64)
+    extents = landmarks.max(axis=-2) - landmarks.min(axis=-2)
+    eyes = _getEyeCenters(landmarks)
+    iod = np.sqrt(np.sum(np.square(eyes[..., 1, :] - eyes[..., 0, :]), axis=-1) )
+    return np.concatenate([extents, iod[..., None] ], axis=-1)
+
+
+def getFaceOrientation(landmarks):
+    """Compute in-plane rotation (roll) of faces from their eye centers
+
+    Arguments:
+    ----------
+        landmarks : numpy.array (..., 68, 2)
+            input landmarks
+
+    Returns:
+    --------
+        angles : numpy.array (...)
+            roll angle of each face in degrees
+    """
+
+    eyes = _getEyeCenters(landmarks)
+    d = eyes[..., 1, :] - eyes[..., 0, :]
+    return np.degrees(np.arctan2(d[..., 1], d[..., 0]) )
+
+
+def getHeadPose(landmarks, image_size, camera_matrix=None):
+    """Estimate head pose of faces with `cv.solvePnP`
+
+    Arguments:
+    ----------
+        landmarks : numpy.array (..., 68, 2)
+            input landmarks
+        image_size : tuple(int, int)
+            (W, H) of frames the landmarks were located in
+
+    Keyword Arguments:
+    ------------------
+        camera_matrix : numpy.array (3, 3) (default: None)
+            camera intrinsics, approximated from the image size if None
+
+    Returns:
+    --------
+        poses : numpy.array (..., 3)
+            (pitch, yaw, roll) of each face in degrees,
+            NaN for padded faces or failed estimations
+    """
+
+    landmarks = np.asarray(landmarks, dtype=np.float64)
+    if camera_matrix is None:
+        W, H = image_size
+        camera_matrix = np.array([[W, 0, W / 2.],
+                                  [0, W, H / 2.],
+                                  [0, 0, 1.] ], dtype=np.float64)
+    dist_coeffs = np.zeros((4, 1) )
+
+    points = landmarks[..., list(HEAD_POSE_IDXS), :]
+    flat_points = np.ascontiguousarray(points.reshape(-1, len(HEAD_POSE_IDXS), 2) )
+    poses = np.full((len(flat_points), 3), np.nan)
+    valid = np.isfinite(flat_points).all(axis=(1, 2) )
+    for i in np.flatnonzero(valid):
+        ok, rvec, _ = cv.solvePnP(HEAD_POSE_MODEL, flat_points[i],
+                                  camera_matrix, dist_coeffs,
+                                  flags=cv.SOLVEPNP_ITERATIVE)
+        if ok:
+            R, _ = cv.Rodrigues(rvec)
+            poses[i] = _rotationToEuler(R)
+
+    return poses.reshape(points.shape[:-2] + (3,) )
+
+
+def _getEyeCenters(landmarks):
+    """Private function for computing (left, right) eye centers"""
+
+    landmarks = np.asarray(landmarks, dtype=np.float64)
+    return np.stack([landmarks[..., list(LEFT_EYE_IDXS), :].mean(axis=-2),
+                     landmarks[..., list(RIGHT_EYE_IDXS), :].mean(axis=-2)],
+                    axis=-2)
+
+
+def _rotationToEuler(R):
+    """Private function for converting rotation matrix to (pitch, yaw, roll)"""
+
+    sy = np.sqrt(R[0, 0] ** 2 + R[1, 0] ** 2)
+    if sy > 1e-6:
+        pitch = np.arctan2(R[2, 1], R[2, 2])
+        yaw = np.arctan2(-R[2, 0], sy)
+        roll = np.arctan2(R[1, 0], R[0, 0])
+    else:
+        pitch = np.arctan2(-R[1, 2], R[1, 1])
+        yaw = np.arctan2(-R[2, 0], sy)
+        roll = 0.
+    return np.degrees([pitch, yaw, roll])
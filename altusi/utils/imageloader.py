@@ -0,0 +1,173 @@
+"""
+ImageLoader class
+=================
+
+Class for streaming still images of directories and glob patterns
+
+Images are decoded at the smallest reduced scale (`IMREAD_REDUCED_*`)
+still reaching the working height, read from the file header before
+decoding, then resized to the working height. Sizes account for the EXIF
+orientation, which `cv.imread` applies when decoding. Decoding runs in a
+background thread pool a bounded number of images ahead of the consumer,
+so memory stays flat whatever the number of images.
+"""
+
+import os
+import glob
+import collections
+import concurrent.futures
+
+import cv2 as cv
+from PIL import Image
+
+from altusi.configs import config as cfg
+from altusi.utils import imgproc
+from altusi.utils.logger import *
+
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+
+# EXIF orientations rotating the image by 90 or 270 degrees
+TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+EXIF_ORIENTATION = 0x0112
+
+# reduced decoding flags by scale factor, from the smallest output
+REDUCED_FLAGS = ((8, cv.IMREAD_REDUCED_COLOR_8),
+                 (4, cv.IMREAD_REDUCED_COLOR_4),
+                 (2, cv.IMREAD_REDUCED_COLOR_2))
+
+
+def listImages(source):
+    """List image files of a directory or a glob pattern lazily
+
+    Arguments:
+    ----------
+        source : str
+            directory, walked recursively, or glob pattern
+
+    Returns:
+    --------
+        generator of str
+            paths to image files
+    """
+
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTS):
+                    yield os.path.join(root, name)
+    else:
+        for path in glob.iglob(source, recursive=True):
+            if path.lower().endswith(IMAGE_EXTS) and os.path.isfile(path):
+                yield path
+
+
+def getDecodeFlag(size, height):
+    """Choose the smallest decoding scale whose output reaches a height
+
+    Arguments:
+    ----------
+        size : tuple(int, int)
+            (W, H) of the image in file
+        height : int
+            expected working height
+
+    Returns:
+    --------
+        flag : int
+            OpenCV imread flag
+    """
+
+    W, H = size
+    for factor, flag in REDUCED_FLAGS:
+        if H // factor >= height:
+            return flag
+    return cv.IMREAD_COLOR
+
+
+class ImageLoader:
+    def __init__(self, source, height=None, workers=None, prefetch=None):
+        """Initialization for Image Loader
+
+        Arguments:
+        ----------
+            source : str
+                directory or glob pattern of input images
+
+        Keyword Arguments:
+        ------------------
+            height : int (default: None)
+                working height of loaded images, `cfg.FRAME_HEIGHT` if None
+            workers : int (default: None)
+                number of decoding threads, number of CPUs if None
+            prefetch : int (default: None)
+                number of images decoded ahead of the consumer,
+                `cfg.IMAGE_PREFETCH` if None
+        """
+
+        self.__source = source
+        self.__height = height if height else cfg.FRAME_HEIGHT
+        self.__workers = workers if workers else os.cpu_count()
+        self.__prefetch = prefetch if prefetch else cfg.IMAGE_PREFETCH
+
+
+    def __load(self, path):
+        """Private function for decoding an image at a reduced scale
+
+        Returns:
+        --------
+            size : tuple(int, int)
+                (W, H) of the image in file, after EXIF orientation
+            image : numpy.array
+                decoded image resized to the working height,
+                None if the image cannot be read
+        """
+
+        try:
+            with Image.open(path) as pil_image:
+                size = pil_image.size
+                if pil_image.getexif().get(EXIF_ORIENTATION, 1) in TRANSPOSED_ORIENTATIONS:
+                    size = size[::-1]
+        except (IOError, SyntaxError):
+            return None, None
+
+        image = cv.imread(path, getDecodeFlag(size, self.__height) )
+        if image is None:
+            return size, None
+        if image.shape[0] != self.__height:
+            image = imgproc.resizeByHeight(image, self.__height)
+        return size, image
+
+
+    def __iter__(self):
+        """Iterate over decoded images in listing order
+
+        Returns:
+        --------
+            generator of tuple(str, tuple(int, int), numpy.array)
+                path, (W, H) of the image in file after EXIF orientation
+                and image resized to the working height; unreadable
+                images are skipped
+        """
+
+        with concurrent.futures.ThreadPoolExecutor(self.__workers) as executor:
+            pending = collections.deque()
+            for path in listImages(self.__source):
+                pending.append((path, executor.submit(self.__load, path) ) )
+                if len(pending) >= self.__prefetch:
+                    yield from self.__pop(pending)
+
+            while pending:
+                yield from self.__pop(pending)
+
+
+    @staticmethod
+    def __pop(pending):
+        """Private function for waiting for the oldest prefetched image"""
+
+        path, future = pending.popleft()
+        size, image = future.result()
+        if image is None:
+            LOG(ERROR, 'Cannot read image', path)
+            return
+        yield path, size, image
@@ -6,6 +6,10 @@ Library to support Image processing functions
 
 Revision
 --------
+    2026, Oct 19:
+        - Add function to compute IoU of bounding boxes `getIoUs`
+        - Add `dst` argument to resizing functions
+        - Support any number of points in `shape2Points`
     2019, Apr 13:
         - Change returned datatype of `shape2Points`
 """
@@ -20,7 +24,30 @@ import dlib
 # SUPPORT FUNCTIONS
 #===============================================================================
 
-def resizeByHeight(image, height=720):
+def getShapeByHeight(shape, height=720):
+    """Compute shape of an image resized by `resizeByHeight`
+
+    Arguments:
+    ----------
+        shape : tuple(int)
+            shape of input image
+
+    Keyword Arguments:
+    ------------------
+        height : int (default: 720)
+            expected height of output image
+
+    Returns:
+    --------
+        out_shape : tuple(int)
+            shape of output resized image
+    """
+    H, W = shape[:2]
+    width = int(1. * W * height / H + 0.5)
+    return (height, width) + tuple(shape[2:])
+
+
+def resizeByHeight(image, height=720, dst=None):
     """Resize an image given the expected height and keep the original ratio
 
     Arguments:
@@ -32,20 +59,23 @@ def resizeByHeight(image, height=720):
     ------------------
         height : int (default: 720)
             expected width of output image
+        dst : numpy.array (default: None)
+            preallocated output image, its shape should be
+            `getShapeByHeight(image.shape, height)`
 
     Returns:
     --------
         out_image : numpy.array
             output resized image
     """
-    H, W = image.shape[:2]
-    width = int(1. * W * height / H + 0.5)
-    out_image = cv.resize(image, (width, height), interpolation=cv.INTER_CUBIC)
+    height, width = getShapeByHeight(image.shape, height)[:2]
+    out_image = cv.resize(image, (width, height), dst=dst,
+                          interpolation=cv.INTER_CUBIC)
 
     return out_image
 
 
-def resizeByWidth(image, width=600):
+def resizeByWidth(image, width=600, dst=None):
     """Resize an image given the expected width and keep the original ratio
 
     Arguments:
@@ -57,6 +87,8 @@ def resizeByWidth(image, width=600):
     ------------------
         width : int (default: 600)
             expected width of output image
+        dst : numpy.array (default: None)
+            preallocated output image
 
     Returns:
     --------
@@ -66,7 +98,8 @@ def resizeByWidth(image, width=600):
 
     H, W = image.shape[:2]
     height = int(H * width / W)
-    out_image = cv.resize(image, (width, height), interpolation=cv.INTER_CUBIC)
+    out_image = cv.resize(image, (width, height), dst=dst,
+                          interpolation=cv.INTER_CUBIC)
     return out_image
 
 
@@ -172,7 +205,7 @@ def shape2Points(shape):
     Arguments:
     ----------
         shape : Dlib-Shape
-            nput shape object
+            input shape object, holding 5 or 68 points
 
     Returns:
     --------
@@ -181,7 +214,7 @@ def shape2Points(shape):
     """
 
     points = []
-    for i in range(68):
+    for i in range(shape.num_parts):
         points.append((shape.part(i).x, shape.part(i).y) )
     return points
 
@@ -203,3 +236,34 @@ def getEuclideanDist(u, v):
     """
 
     return np.sqrt(np.sum(np.square((np.subtract(u, v) ) ) ) )
+
+
+def getIoUs(bboxes_a, bboxes_b):
+    """Compute Intersection-over-Union between 2 sets of bounding boxes
+
+    Arguments:
+    ----------
+        bboxes_a : list(numpy.array([x, y, w, h] ) )
+            first set of M bounding boxes
+        bboxes_b : list(numpy.array([x, y, w, h] ) )
+            second set of K bounding boxes
+
+    Returns:
+    --------
+        ious : numpy.array (M, K)
+            IoU of every pair of bounding boxes
+    """
+
+    a = np.asarray(bboxes_a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(bboxes_b, dtype=np.float64).reshape(-1, 4)
+
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 0] + a[:, None, 2], b[None, :, 0] + b[None, :, 2])
+    y2 = np.minimum(a[:, None, 1] + a[:, None, 3], b[None, :, 1] + b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+
+    areas_a = a[:, 2] * a[:, 3]
+    areas_b = b[:, 2] * b[:, 3]
+    union = areas_a[:, None] + areas_b[None, :] - inter
+    return inter / np.maximum(union, 1e-9)
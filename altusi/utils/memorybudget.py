@@ -0,0 +1,182 @@
+"""
+MemoryBudget class
+==================
+
+Class for accounting memory footprint and shedding load under a budget
+
+Subsystems (models, frame buffers, queues, caches) register a function
+returning their footprint in bytes. The process' resident memory is
+checked every frame against the budget and a shedding level is raised
+when it gets close, the pipeline reacts to each level:
+
+    * 1: shrink queues and flush buffered caches
+    * 2: drop to a lower working resolution
+    * 3: skip rendering
+
+Levels are lowered again with a hysteresis margin. Periodic reports log
+the footprint of every subsystem next to RSS and, when tracing is enabled,
+`tracemalloc` snapshots. Tracing adds memory and CPU overhead to every
+allocation, it is meant for investigating a footprint, not for production.
+"""
+
+import os
+import resource
+import tracemalloc
+
+from altusi.configs import config as cfg
+from altusi.utils.logger import *
+
+SHED_QUEUES = 1
+SHED_RESOLUTION = 2
+SHED_RENDERING = 3
+
+
+def getRSS():
+    """Get resident set size of the process
+
+    Returns:
+    --------
+        rss : int
+            resident memory in bytes, peak resident memory
+            where `/proc` is not available
+    """
+
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class MemoryBudget:
+    def __init__(self, budget, thresholds=None, report_every=None, trace=None):
+        """Initialization for Memory Budget
+
+        Arguments:
+        ----------
+            budget : int
+                memory budget of the process in bytes
+
+        Keyword Arguments:
+        ------------------
+            thresholds : tuple(float, float, float) (default: None)
+                fractions of the budget raising each shedding level,
+                `cfg.MEM_SHED_THRESHOLDS` if None
+            report_every : float (default: None)
+                seconds between footprint reports, `cfg.MEM_REPORT_EVERY` if None
+            trace : bool (default: None)
+                whether to trace Python allocations with `tracemalloc`,
+                `cfg.MEM_TRACEMALLOC` if None
+        """
+
+        self.__budget = budget
+        self.__thresholds = thresholds if thresholds else cfg.MEM_SHED_THRESHOLDS
+        self.__report_every = report_every if report_every else cfg.MEM_REPORT_EVERY
+        self.__trace = cfg.MEM_TRACEMALLOC if trace is None else trace
+
+        self.__footprints = {}
+        self.__level = 0
+        self.__rss = getRSS()
+        self.__last_report = time.time()
+
+        if self.__trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+
+    def register(self, name, footprint):
+        """Register a subsystem whose footprint is accounted
+
+        Arguments:
+        ----------
+            name : str
+                name of the subsystem, e.g. `models.detector`
+            footprint : callable
+                function returning the footprint of the subsystem in bytes
+        """
+
+        self.__footprints[name] = footprint
+
+
+    def update(self):
+        """Check memory against the budget, report periodically
+
+        Returns:
+        --------
+            level : int
+                current shedding level, 0 when no load is shed
+        """
+
+        self.__rss = getRSS()
+        ratio = 1. * self.__rss / self.__budget
+
+        level = self.__level
+        while level < len(self.__thresholds) and ratio >= self.__thresholds[level]:
+            level += 1
+        while level > 0 and ratio < self.__thresholds[level - 1] - cfg.MEM_SHED_HYSTERESIS:
+            level -= 1
+
+        if level != self.__level:
+            LOG(INFO, 'Memory {:.1f}/{:.1f} MB - shedding level {} -> {}'.format(
+                self.__rss / 2**20, self.__budget / 2**20, self.__level, level) )
+            self.__level = level
+            self.report(top=0)
+        elif time.time() - self.__last_report >= self.__report_every:
+            self.report()
+
+        return self.__level
+
+
+    def getFootprints(self):
+        """Get footprint of each registered subsystem
+
+        Returns:
+        --------
+            footprints : dict(str: int)
+                footprint in bytes of each subsystem
+        """
+
+        return {name: int(footprint() ) for name, footprint in self.__footprints.items()}
+
+
+    def report(self, top=5):
+        """Log footprints of subsystems, RSS and top Python allocation sites
+
+        Keyword Arguments:
+        ------------------
+            top : int (default: 5)
+                number of allocation sites reported from a `tracemalloc`
+                snapshot, 0 skips taking the snapshot
+        """
+
+        self.__last_report = time.time()
+        footprints = self.getFootprints()
+
+        LOG(INFO, 'Memory report - RSS {:.1f} MB of {:.1f} MB budget - level {}'.format(
+            self.__rss / 2**20, self.__budget / 2**20, self.__level) )
+        for name, nbytes in sorted(footprints.items() ):
+            LOG(INFO, '    {:<24s} {:8.1f} MB'.format(name, nbytes / 2**20) )
+        LOG(INFO, '    {:<24s} {:8.1f} MB'.format('unaccounted',
+            (self.__rss - sum(footprints.values() ) ) / 2**20) )
+
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            LOG(INFO, '    tracemalloc: current {:.1f} MB - peak {:.1f} MB'.format(
+                current / 2**20, peak / 2**20) )
+            if top:
+                stats = tracemalloc.take_snapshot().statistics('lineno')
+                for stat in stats[:top]:
+                    LOG(INFO, '        {}'.format(stat) )
+
+
+    @property
+    def level(self):
+        """Current shedding level"""
+
+        return self.__level
+
+
+    @property
+    def rss(self):
+        """Resident memory in bytes at the last update"""
+
+        return self.__rss
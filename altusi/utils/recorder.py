@@ -0,0 +1,244 @@
+"""
+VideoRecorder class
+===================
+
+Class for recording annotated frames without slowing down the pipeline
+
+Frames are copied into a ring of preallocated buffers and handed to a
+dedicated encoder thread running `cv.VideoWriter` through a bounded
+queue. When the encoder cannot keep up, the `drop` policy discards new
+frames so that the caller never waits, while the `block` policy waits
+for a free buffer so that no frame is lost. The queue can be shrunk
+and grown back while recording to bound memory.
+"""
+
+import queue
+import threading
+
+import numpy as np
+import cv2 as cv
+
+from altusi.configs import config as cfg
+from altusi.utils import imgproc
+from altusi.utils.logger import *
+
+
+class VideoRecorder:
+    def __init__(self, path, fps, height=None, codec=None, every=1,
+                 queue_size=None, policy=None):
+        """Initialization for Video Recorder
+
+        Arguments:
+        ----------
+            path : str
+                path to output video file
+            fps : float
+                rate of frames passed to `write`
+
+        Keyword Arguments:
+        ------------------
+            height : int (default: None)
+                height of recorded frames, input frames' height if None
+            codec : str (default: None)
+                FourCC code of the encoder, `cfg.RECORD_CODEC` if None
+            every : int (default: 1)
+                record one frame out of every `every` frames
+            queue_size : int (default: None)
+                number of frames waiting for the encoder,
+                `cfg.RECORD_QUEUE_SIZE` if None
+            policy : str (default: None)
+                behaviour when the queue is full, `cfg.RECORD_POLICY` if None
+                    * drop: discard the frame
+                    * block: wait for the encoder
+        """
+
+        self.__path = path
+        self.__fps = fps / every
+        self.__height = height
+        self.__codec = codec if codec else cfg.RECORD_CODEC
+        self.__every = every
+        self.__queue_size = queue_size if queue_size else cfg.RECORD_QUEUE_SIZE
+        self.__policy = policy if policy else cfg.RECORD_POLICY
+
+        self.__free = queue.Queue()
+        self.__pending = queue.Queue()
+        self.__lock = threading.Lock()
+        self.__n_buffers = 0
+        self.__shape = None
+        self.__writer = None
+        self.__thread = None
+
+        self.__stats = {'seen': 0, 'decimated': 0, 'dropped': 0,
+                        'queued': 0, 'encoded': 0, 'blocked_time': 0.}
+
+
+    def __open(self, frame):
+        """Private function for opening the encoder given the first frame"""
+
+        if self.__height:
+            shape = imgproc.getShapeByHeight(frame.shape, self.__height)
+        else:
+            shape = frame.shape
+        self.__shape = (shape, frame.dtype)
+        for i in range(self.__queue_size):
+            self.__free.put(np.empty(shape, dtype=frame.dtype) )
+        self.__n_buffers = self.__queue_size
+
+        H, W = shape[:2]
+        self.__writer = cv.VideoWriter(self.__path,
+                                       cv.VideoWriter_fourcc(*self.__codec),
+                                       self.__fps, (W, H) )
+        if not self.__writer.isOpened():
+            LOG(ERROR, 'Cannot open video writer for', self.__path)
+
+        self.__thread = threading.Thread(target=self.__encode, daemon=True)
+        self.__thread.start()
+        LOG(INFO, 'Recording {}x{} at {:.2f} FPS to'.format(W, H, self.__fps),
+            self.__path)
+
+
+    def __encode(self):
+        """Private function for encoding queued frames in the encoder thread"""
+
+        while True:
+            buffer = self.__pending.get()
+            if buffer is None:
+                break
+            self.__writer.write(buffer)
+            self.__stats['encoded'] += 1
+            self.__release(buffer)
+
+
+    def __release(self, buffer):
+        """Private function for returning a buffer, freed if the queue shrank"""
+
+        with self.__lock:
+            if self.__n_buffers > self.__queue_size:
+                self.__n_buffers -= 1
+                return
+        self.__free.put(buffer)
+
+
+    def __acquire(self):
+        """Private function for taking a free buffer without waiting
+
+        A buffer is allocated if the queue grew back since it shrank.
+        """
+
+        try:
+            return self.__free.get_nowait()
+        except queue.Empty:
+            with self.__lock:
+                if self.__n_buffers >= self.__queue_size:
+                    return None
+                self.__n_buffers += 1
+            return np.empty(*self.__shape)
+
+
+    def setQueueSize(self, queue_size):
+        """Change the number of frames waiting for the encoder
+
+        Free buffers beyond the new size are released at once, queued ones
+        as soon as they are encoded.
+
+        Arguments:
+        ----------
+            queue_size : int
+                new number of frames waiting for the encoder, at least 1
+        """
+
+        with self.__lock:
+            self.__queue_size = max(1, queue_size)
+        if self.__writer is None:
+            return
+
+        while True:
+            with self.__lock:
+                if self.__n_buffers <= self.__queue_size:
+                    break
+                try:
+                    self.__free.get_nowait()
+                except queue.Empty:
+                    break
+                self.__n_buffers -= 1
+
+
+    def write(self, frame):
+        """Hand a frame over to the encoder thread
+
+        The frame is copied, it can be reused by the caller right away.
+
+        Arguments:
+        ----------
+            frame : numpy.array
+                annotated frame to record
+
+        Returns:
+        --------
+            queued : bool
+                whether the frame is queued for encoding
+        """
+
+        self.__stats['seen'] += 1
+        if (self.__stats['seen'] - 1) % self.__every:
+            self.__stats['decimated'] += 1
+            return False
+
+        if self.__writer is None:
+            self.__open(frame)
+
+        buffer = self.__acquire()
+        if buffer is None and self.__policy == 'block':
+            _start_t = time.time()
+            buffer = self.__free.get()
+            self.__stats['blocked_time'] += time.time() - _start_t
+        elif buffer is None:
+            self.__stats['dropped'] += 1
+            return False
+
+        if buffer.shape == frame.shape:
+            np.copyto(buffer, frame)
+        else:
+            # resize to the buffer's exact size, a width derived from the
+            # height may be a pixel off and make OpenCV allocate a new array
+            cv.resize(frame, (buffer.shape[1], buffer.shape[0]), dst=buffer,
+                      interpolation=cv.INTER_CUBIC)
+        self.__pending.put(buffer)
+        self.__stats['queued'] += 1
+        return True
+
+
+    def close(self):
+        """Encode remaining frames and close the output file"""
+
+        if self.__writer is None:
+            return
+
+        self.__pending.put(None)
+        self.__thread.join()
+        self.__writer.release()
+        self.__writer = None
+
+
+    @property
+    def queue_size(self):
+        """Number of frames waiting for the encoder"""
+
+        return self.__queue_size
+
+
+    @property
+    def nbytes(self):
+        """Total size of frame buffers in bytes"""
+
+        if self.__shape is None:
+            return 0
+        shape, dtype = self.__shape
+        return self.__n_buffers * int(np.prod(shape) ) * np.dtype(dtype).itemsize
+
+
+    @property
+    def stats(self):
+        """Counts of seen, decimated, dropped, queued and encoded frames"""
+
+        return dict(self.__stats)
@@ -0,0 +1,227 @@
+"""
+Auto-Tuner
+==========
+
+Sweep pipeline's parameters on the running device against a sample video
+and write a performance profile loaded by `altusi.configs.config`
+
+Every combination of working height, OpenCV-DNN input size, OpenCV
+thread count and landmarking worker count is run once over the sample
+video with the lowest candidate confidence; confidence thresholds and
+frame skips are then evaluated on the recorded detections. Recall is
+measured against detections of the highest quality configuration, a
+skipped frame reuses detections of the last processed frame. Throughput
+is the number of video frames handled per second.
+
+usage: auto-tuner.py [-h] --video VIDEO [--lib LIB] [--frames FRAMES]
+                     [--heights HEIGHTS [HEIGHTS ...]]
+                     [--input_sizes INPUT_SIZES [INPUT_SIZES ...]]
+                     [--confs CONFS [CONFS ...]] [--skips SKIPS [SKIPS ...]]
+                     [--threads THREADS [THREADS ...]]
+                     [--workers WORKERS [WORKERS ...]]
+                     [--min_recall MIN_RECALL] [--output OUTPUT]
+
+optional arguments:
+    -h, --help            show this help message and exit
+    --video VIDEO, -v VIDEO
+                          path to sample video used for tuning
+    --lib LIB, -l LIB     name of face detector in use
+    --frames FRAMES, -f FRAMES
+                          number of video frames used for each trial
+    --heights HEIGHTS [HEIGHTS ...]
+                          candidate working heights of frames
+    --input_sizes INPUT_SIZES [INPUT_SIZES ...]
+                          candidate input sizes of OpenCV-DNN detector
+    --confs CONFS [CONFS ...]
+                          candidate confidence thresholds
+    --skips SKIPS [SKIPS ...]
+                          candidate frame skips
+    --threads THREADS [THREADS ...]
+                          candidate OpenCV thread counts (default: 1..#CPUs)
+    --workers WORKERS [WORKERS ...]
+                          candidate landmarking worker counts (default: 1 and #CPUs)
+    --min_recall MIN_RECALL
+                          minimum recall of the selected configuration
+    --output OUTPUT, -o OUTPUT
+                          path to output performance profile
+"""
+
+import os
+import json
+import platform
+import itertools
+
+import numpy as np
+import cv2 as cv
+
+from altusi.configs import config as cfg
+from altusi.core.detection import FaceDetector
+from altusi.core.detection import FaceLandmarker
+
+from altusi.helper import funcs as fn
+from altusi.utils import imgproc
+from altusi.utils.logger import *
+
+
+def runTrial(video_link, lib, n_frames, height, input_size, n_threads, conf,
+             face_landmarker):
+    """Run the pipeline once over the sample video
+
+    Returns:
+    --------
+        prx_t : float
+            mean processing time of a frame
+        dets : list(tuple(numpy.array, numpy.array) )
+            confidences and bounding boxes of each frame,
+            boxes are normalized by frame's height
+    """
+
+    cv.setNumThreads(n_threads)
+    face_detector = FaceDetector(lib=lib, input_size=input_size)
+
+    cap = cv.VideoCapture(video_link)
+    times, dets = [], []
+    while len(dets) < n_frames:
+        _, frm = cap.read()
+        if not _: break
+
+        frm = imgproc.resizeByHeight(frm, height)
+
+        _start_t = time.time()
+        confs, bboxes = face_detector.getFaces(frm, conf)
+        if len(bboxes):
+            face_landmarker.findLandmarksTiered(frm, bboxes, len(dets) )
+        times.append(time.time() - _start_t)
+
+        if confs is None:
+            confs = [1.] * len(bboxes)
+        dets.append((np.array(confs),
+                     np.array(bboxes, dtype=np.float64).reshape(-1, 4) / height) )
+    cap.release()
+
+    # the first inference includes network's warm-up
+    prx_t = np.mean(times[1:]) if len(times) > 1 else np.mean(times)
+    return prx_t, dets
+
+
+def getRecall(dets, ref_dets, conf, skip, iou_thresh=0.5):
+    """Compute recall of detections against reference detections
+
+    Frames which are skipped reuse detections of the last processed frame.
+    """
+
+    n_matched, n_total = 0, 0
+    for i, (_, ref_bboxes) in enumerate(ref_dets):
+        if not len(ref_bboxes): continue
+
+        confs, bboxes = dets[i - i % skip]
+        bboxes = bboxes[confs >= conf]
+        n_total += len(ref_bboxes)
+        if len(bboxes):
+            ious = imgproc.getIoUs(ref_bboxes, bboxes)
+            n_matched += int(np.sum(ious.max(axis=1) >= iou_thresh) )
+
+    return n_matched / n_total if n_total else 1.
+
+
+def getParetoFront(results):
+    """Select results which are not dominated in both throughput and recall"""
+
+    front, best_recall = [], -1.
+    for result in sorted(results, key=lambda r: (-r['fps'], -r['recall']) ):
+        if result['recall'] > best_recall:
+            front.append(result)
+            best_recall = result['recall']
+    return front
+
+
+def tune(args):
+    threads = args.threads if args.threads else list(range(1, os.cpu_count() + 1) )
+    workers = args.workers if args.workers else sorted({1, os.cpu_count()})
+    input_sizes = args.input_sizes
+    confs = args.confs
+    if args.lib == 'dlib':
+        input_sizes = [cfg.DNN_INPUT_SIZE]
+        confs = [cfg.FACE_CONF]
+    min_conf = min(confs)
+
+    trials = {}
+    for n_workers in workers:
+        face_landmarker = FaceLandmarker(workers=n_workers)
+        for height, input_size, n_threads in itertools.product(
+                sorted(args.heights, reverse=True),
+                sorted(input_sizes, reverse=True), threads):
+            prx_t, dets = runTrial(args.video, args.lib, args.frames,
+                                   height, input_size, n_threads, min_conf,
+                                   face_landmarker)
+            trials[(height, input_size, n_threads, n_workers)] = (prx_t, dets)
+            LOG(INFO, 'Trial height={} input_size={} threads={} workers={}: {:.3f}s/frame'.format(
+                height, input_size, n_threads, n_workers, prx_t) )
+        face_landmarker.close()
+
+    # reference: highest quality trial
+    _, ref_dets = trials[(max(args.heights), max(input_sizes), threads[0], workers[0])]
+
+    results = []
+    for (height, input_size, n_threads, n_workers), (prx_t, dets) in trials.items():
+        for conf, skip in itertools.product(confs, args.skips):
+            results.append({
+                'params': {
+                    'FRAME_HEIGHT': height,
+                    'DNN_INPUT_SIZE': input_size,
+                    'FACE_CONF': conf,
+                    'FRAME_SKIP': skip,
+                    'NUM_THREADS': n_threads,
+                    'NUM_WORKERS': n_workers
+                },
+                'fps': float(skip / max(prx_t, 1e-9) ),
+                'recall': float(getRecall(dets, ref_dets, conf, skip) )
+            })
+
+    pareto = getParetoFront(results)
+    eligible = [r for r in pareto if r['recall'] >= args.min_recall]
+    if eligible:
+        selected = max(eligible, key=lambda r: r['fps'])
+    else:
+        LOG(ERROR, 'No configuration reaches recall', args.min_recall)
+        selected = max(pareto, key=lambda r: r['recall'])
+
+    return {
+        'device': {
+            'node': platform.node(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count()
+        },
+        'video': args.video,
+        'lib': args.lib,
+        'frames': args.frames,
+        'min_recall': args.min_recall,
+        'created': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime() ),
+        'selected': selected['params'],
+        'pareto': pareto
+    }
+
+
+def main(args):
+    profile = tune(args)
+
+    output = args.output if args.output else cfg.PERF_PROFILE
+    with open(output, 'w') as f:
+        json.dump(profile, f, indent=4)
+
+    for result in profile['pareto']:
+        LOG(INFO, 'Pareto: FPS {:.3f} - recall {:.3f} -'.format(
+            result['fps'], result['recall']), result['params'])
+    LOG(INFO, 'Selected:', profile['selected'])
+    LOG(INFO, 'Profile written to', output)
+
+
+if __name__ == '__main__':
+    print(__doc__)
+
+    LOG(INFO, 'Experiment: Auto-tuning Facial Landmark detection')
+
+    args = fn.getTunerArgs()
+    main(args)
+
+    LOG(INFO, 'Process done')
@@ -0,0 +1,53 @@
+"""
+Face Index Query
+================
+
+Answer face-occurrence queries of a processed recording from its index,
+written by `landmark-detector.py --index`, without touching the video
+
+usage: face-index.py [-h] --index INDEX [--query {intervals,count,first}]
+                     [--start START] [--end END] [--min_faces MIN_FACES]
+
+optional arguments:
+    -h, --help            show this help message and exit
+    --index INDEX, -x INDEX
+                          path to face-occurrence index (.npz)
+    --query {intervals,count,first}, -q {intervals,count,first}
+                          time ranges with faces, face counts or first appearance
+    --start START         start of queried range in seconds
+    --end END             end of queried range in seconds
+    --min_faces MIN_FACES
+                          minimum number of faces
+"""
+
+from altusi.helper import funcs as fn
+from altusi.utils.faceindex import FaceIndex
+from altusi.utils.logger import *
+
+
+def main(args):
+    face_index = FaceIndex(args.index)
+
+    _start_t = time.time()
+    if args.query == 'intervals':
+        intervals = face_index.getIntervals(args.start, args.end, args.min_faces)
+        _prx_t = time.time() - _start_t
+        for start, end in intervals:
+            print('{:10.2f}s - {:10.2f}s'.format(start, end) )
+    elif args.query == 'count':
+        counts = face_index.count(args.start, args.end)
+        _prx_t = time.time() - _start_t
+        for name, value in counts.items():
+            print('{:>20s}: {}'.format(name, value) )
+    else:
+        first = face_index.firstAppearance(args.start, args.min_faces)
+        _prx_t = time.time() - _start_t
+        print('first appearance: {}'.format(
+            'never' if first is None else '{:.2f}s'.format(first) ) )
+
+    LOG(INFO, 'Query answered in {:.3f} ms'.format(1e3 * _prx_t) )
+
+
+if __name__ == '__main__':
+    args = fn.getIndexArgs()
+    main(args)
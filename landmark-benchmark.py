@@ -0,0 +1,94 @@
+"""
+Landmarking Benchmark
+=====================
+
+Measure speedup of parallel facial landmark detection versus face count
+
+Faces detected in the input image are repeated to reach each face count,
+then serial, thread-pool and process-pool landmarking are timed.
+
+usage: landmark-benchmark.py [-h] --image IMAGE [--lib LIB]
+                             [--faces FACES [FACES ...]] [--workers WORKERS]
+                             [--points POINTS] [--iters ITERS]
+
+optional arguments:
+    -h, --help            show this help message and exit
+    --image IMAGE, -i IMAGE
+                          path to image holding at least one face
+    --lib LIB, -l LIB     name of face detector in use
+    --faces FACES [FACES ...]
+                          face counts to benchmark
+    --workers WORKERS, -w WORKERS
+                          number of parallel workers (default: #CPUs)
+    --points POINTS, -p POINTS
+                          number of facial points (5 or 68)
+    --iters ITERS         number of timed runs for each face count
+"""
+
+import os
+
+import numpy as np
+import cv2 as cv
+
+from altusi.configs import config as cfg
+from altusi.core.detection import FaceDetector
+from altusi.core.detection import FaceLandmarker
+
+from altusi.helper import funcs as fn
+from altusi.utils import imgproc
+from altusi.utils.logger import *
+
+
+def timeLandmarks(face_landmarker, image, bboxes, n_points, iters):
+    """Mean time of locating landmarks of all faces, after a warm-up run"""
+
+    face_landmarker.findLandmarks(image, bboxes, n_points)
+
+    _start_t = time.time()
+    for i in range(iters):
+        face_landmarker.findLandmarks(image, bboxes, n_points)
+    return (time.time() - _start_t) / iters
+
+
+def main(args):
+    image = cv.imread(args.image)
+    image = imgproc.resizeByHeight(image, cfg.FRAME_HEIGHT)
+
+    _, faces = FaceDetector(lib=args.lib).getFaces(image)
+    if not len(faces):
+        LOG(ERROR, 'No face detected in', args.image)
+        return
+
+    workers = args.workers if args.workers else os.cpu_count()
+    landmarkers = [
+        ('serial', FaceLandmarker(workers=1) ),
+        ('thread', FaceLandmarker(workers=workers, mode='thread', min_faces=1) ),
+        ('process', FaceLandmarker(workers=workers, mode='process', min_faces=1) )
+    ]
+
+    LOG(INFO, 'Workers: {} - points: {} - detected faces: {}'.format(
+        workers, args.points, len(faces) ) )
+    print('{:>6s} {:>12s} {:>20s} {:>20s}'.format(
+        'faces', 'serial (ms)', 'thread (ms, x)', 'process (ms, x)') )
+    for n_faces in args.faces:
+        bboxes = [faces[i % len(faces)] for i in range(n_faces)]
+        times = [timeLandmarks(face_landmarker, image, bboxes, args.points, args.iters)
+                 for _, face_landmarker in landmarkers]
+        print('{:>6d} {:>12.2f} {:>13.2f} {:>5.2f}x {:>13.2f} {:>5.2f}x'.format(
+            n_faces, 1e3 * times[0],
+            1e3 * times[1], times[0] / times[1],
+            1e3 * times[2], times[0] / times[2]) )
+
+    for _, face_landmarker in landmarkers:
+        face_landmarker.close()
+
+
+if __name__ == '__main__':
+    print(__doc__)
+
+    LOG(INFO, 'Experiment: Parallel Facial Landmark detection benchmark')
+
+    args = fn.getBenchmarkArgs()
+    main(args)
+
+    LOG(INFO, 'Process done')
@@ -7,6 +7,12 @@ Face detection is performed every single frame then detect facial landmarks
 
 usage: landmark-detector.py [-h] [--video VIDEO] [--flip_hor] [--flip_ver]
                             [--show] [--name NAME] [--lib LIB]
+                            [--profile PROFILE] [--cache CACHE]
+                            [--cache_key {index,hash}] [--record]
+                            [--record_height RECORD_HEIGHT]
+                            [--record_every RECORD_EVERY] [--codec CODEC]
+                            [--record_policy {drop,block}] [--index INDEX]
+                            [--mem_budget MEM_BUDGET] [--mem_trace]
 
 optional arguments:
     -h, --help            show this help message and exit
@@ -17,6 +23,25 @@ optional arguments:
     --show, -s            whether or not the output is visualized
     --name NAME, -n NAME  name of video stream used for recording
     --lib LIB, -l LIB     name of face detector in use
+    --profile PROFILE, -p PROFILE
+                          path to performance profile written by auto-tuner.py
+    --cache CACHE, -c CACHE
+                          path to detection cache database
+    --cache_key {index,hash}
+                          key cached detections by frame index or frame hash
+    --record, -r          record annotated video to <NAME>.avi
+    --record_height RECORD_HEIGHT
+                          height of recorded frames
+    --record_every RECORD_EVERY
+                          record one processed frame out of every N frames
+    --codec CODEC         FourCC code of recording encoder
+    --record_policy {drop,block}
+                          drop frames or block when the encoder lags
+    --index INDEX, -x INDEX
+                          path to output face-occurrence index (.npz)
+    --mem_budget MEM_BUDGET, -m MEM_BUDGET
+                          memory budget in MB, load is shed when close to it
+    --mem_trace           log top tracemalloc allocation sites in memory reports
 
 Keys
 ----
@@ -31,58 +56,151 @@ import dlib
 from altusi.configs import config as cfg
 from altusi.core.detection import FaceDetector
 from altusi.core.detection import FaceLandmarker 
+from altusi.core.detection import DetectionCache
 
 from altusi.helper import funcs as fn
 from altusi.utils import drawer, imgproc
+from altusi.utils.bufferpool import BufferPool
+from altusi.utils.recorder import VideoRecorder
+from altusi.utils.faceindex import FaceIndexWriter
+from altusi.utils import memorybudget
+from altusi.utils.memorybudget import MemoryBudget
 from altusi.utils.logger import *
 
 
-def app(video_link, video_name, lib, show=True, flip_hor=False, flip_ver=False):
+def app(video_link, video_name, lib, show=True, flip_hor=False, flip_ver=False,
+        cache_path=None, cache_key='index', record=None, index_path=None,
+        mem_budget=None, mem_trace=False):
+    if cfg.NUM_THREADS >= 0:
+        cv.setNumThreads(cfg.NUM_THREADS)
+    LOG(INFO, 'Pipeline parameters:', {k: getattr(cfg, k) for k in cfg.PROFILE_KEYS})
+
     # initialize Video writer
     cap = cv.VideoCapture(video_link)
-    (H, W), FPS = imgproc.cameraCalibrate(cap, False)
+    (W, H), FPS = imgproc.cameraCalibrate(cap, False)
     LOG(INFO, 'Camera info: {}\n'.format((H, W, FPS) ) )
 
+    face_index = FaceIndexWriter(index_path, FPS, (W, H) ) if index_path else None
+
+    # only processed frames are recorded
+    recorder = None
+    if record is not None:
+        recorder = VideoRecorder('{}.avi'.format(video_name),
+                                 (FPS if FPS > 0 else 30.) / cfg.FRAME_SKIP,
+                                 **record)
+
+    # frames of every stage are written into preallocated buffers
+    pool = BufferPool(trace=cfg.DEBUG_ALLOCS)
+
     LOG(INFO, 'Face Detector in Use:', lib)
-    face_detector = FaceDetector(lib=lib)
+    face_detector = FaceDetector(lib=lib, pool=pool)
     face_landmarker = FaceLandmarker() 
 
+    # cached detections are keyed by everything the detector's output depends on
+    cache, source_id = None, None
+    if cache_path:
+        source_id = DetectionCache.getSourceId(video_link)
+        if cache_key == 'index' and source_id is None:
+            LOG(ERROR, 'Live stream cannot be cached by frame index, use --cache_key hash')
+        else:
+            cache = DetectionCache(cache_path)
+            cache_config = dict(face_detector.config, height=cfg.FRAME_HEIGHT)
+            if lib != 'dlib':
+                cache_config['conf'] = cfg.FACE_CONF
+            if cache_key == 'index':
+                cache_config.update(flip_hor=flip_hor, flip_ver=flip_ver)
+            else:
+                source_id = None
+
+    # footprint of every subsystem is accounted against the memory budget
+    budget = None
+    if mem_budget:
+        budget = MemoryBudget(int(mem_budget * 2**20),
+                              trace=True if mem_trace else None)
+        budget.register('models.detector', lambda: face_detector.nbytes)
+        budget.register('models.landmarker', lambda: face_landmarker.nbytes)
+        budget.register('buffers.frames', lambda: pool.nbytes)
+        if recorder:
+            budget.register('queues.recorder', lambda: recorder.nbytes)
+            record_queue_size = recorder.queue_size
+        if cache:
+            budget.register('caches.detection', lambda: cache.nbytes)
+
+    level, height, render = 0, cfg.FRAME_HEIGHT, True
     cnt_frm = 0
     playing = True
     while cap.isOpened():
         if playing:
-            _, frm = cap.read()
+            pool.beginFrame()
+            _, frm = cap.read(pool.get('capture', (H, W, 3) ) )
             if not _:
                 LOG(INFO, 'Reached the end of Video stream')
                 break
-
-            if flip_ver: frm = cv.flip(frm, 0)
-            if flip_hor: frm = cv.flip(frm, 1)
-
-            frm = imgproc.resizeByHeight(frm, 600)
+            pool.check('capture', frm)
 
             cnt_frm += 1
 
             # just to reduce the amount of processing
-            if cnt_frm % 3 != 1: continue
+            if (cnt_frm - 1) % cfg.FRAME_SKIP: continue
+
+            if flip_ver: frm = pool.check('flip_ver',
+                cv.flip(frm, 0, dst=pool.get('flip_ver', frm.shape) ) )
+            if flip_hor: frm = pool.check('flip_hor',
+                cv.flip(frm, 1, dst=pool.get('flip_hor', frm.shape) ) )
+
+            if budget:
+                level = budget.update()
+                if recorder:
+                    recorder.setQueueSize(cfg.MEM_SHED_QUEUE_SIZE
+                        if level >= memorybudget.SHED_QUEUES else record_queue_size)
+                if cache and level >= memorybudget.SHED_QUEUES:
+                    cache.flush()
+                height = min(cfg.FRAME_HEIGHT, cfg.MEM_SHED_HEIGHT) \
+                    if level >= memorybudget.SHED_RESOLUTION else cfg.FRAME_HEIGHT
+            render = level < memorybudget.SHED_RENDERING
+
+            frm = pool.check('frame', imgproc.resizeByHeight(frm, height,
+                dst=pool.get('frame', imgproc.getShapeByHeight(frm.shape, height) ) ) )
 
             # detect faces and then detect landmarks if faces are presented
             _start_t = time.time()
-            confs, bboxes = face_detector.getFaces(frm)
+            result = None
+            if cache:
+                frame_key = cnt_frm if cache_key == 'index' else DetectionCache.getFrameHash(frm)
+                key = DetectionCache.makeKey(source_id, frame_key,
+                                             dict(cache_config, height=height) )
+                result = cache.get(key)
+            if result is None:
+                confs, bboxes = face_detector.getFaces(frm)
+                if cache: cache.put(key, confs, bboxes)
+            else:
+                confs, bboxes = result
+            # the first frame is read by `cameraCalibrate`
+            if face_index: face_index.add(cnt_frm, bboxes, 1. * H / frm.shape[0])
             if len(bboxes):
-                landmarks = face_landmarker.findLandmarks(frm, bboxes)
+                landmarks = face_landmarker.findLandmarksTiered(
+                    frm, bboxes, (cnt_frm - 1) // cfg.FRAME_SKIP)
             # calculate FPS based on the processing time for each frame
             _prx_t = time.time() - _start_t
 
 
-            for i, bbox in enumerate(bboxes):
-                for j, point in enumerate(landmarks[i] ):
-                    x, y = point
-                    cv.circle(frm, (x, y), 2, drawer.COLOR_YELLOW, -1)
+            if render:
+                for i, bbox in enumerate(bboxes):
+                    for j, point in enumerate(landmarks[i] ):
+                        x, y = point
+                        cv.circle(frm, (x, y), 2, drawer.COLOR_YELLOW, -1)
 
-            frm = drawer.drawInfo(frm, ['Raspberry Pi - {} - FPS: {:.3f}'.format(lib, 1/_prx_t)])
+                drawer.drawInfo(frm, ['Raspberry Pi - {} - FPS: {:.3f}'.format(lib, 1/_prx_t)], dst=frm)
 
-        cv.imshow('', frm)
+                if recorder: recorder.write(frm)
+
+            n_allocs = pool.endFrame()
+            if n_allocs and cnt_frm > 1:
+                LOG(DEBUG, 'Frame buffers allocated in frame {}:'.format(cnt_frm), n_allocs)
+            if pool.frame_nbytes is not None:
+                LOG(DEBUG, 'Bytes allocated in frame {}:'.format(cnt_frm), pool.frame_nbytes)
+
+        if render: cv.imshow('', frm)
         key = cv.waitKey(1)
         if key == ord(' '):
             playing = not playing
@@ -90,13 +208,44 @@ def app(video_link, video_name, lib, show=True, flip_hor=False, flip_ver=False):
             LOG(INFO, 'Interrupted by users')
             break
 
+    LOG(INFO, 'Frame buffers allocated: {} ({:.1f} MB)'.format(
+        pool.n_allocs, pool.nbytes / 2**20) )
+
+    if budget:
+        budget.report()
+
+    LOG(INFO, 'Landmarking stats:', face_landmarker.stats)
+    face_landmarker.close()
+
+    if face_index:
+        face_index.close(n_frames=cnt_frm + 1)
+
+    if recorder:
+        recorder.close()
+        LOG(INFO, 'Recording stats:', recorder.stats)
+
+    if cache:
+        LOG(INFO, 'Detection cache: {} hits, {} misses, hit rate {:.1%}'.format(
+            cache.n_hits, cache.n_misses, cache.hit_rate) )
+        cache.close()
+
     cap.release()
     cv.destroyAllWindows()
 
 
 def main(args):
+    if args.profile:
+        cfg.loadProfile(args.profile, required=True)
     video_link = args.video if args.video else 0 
-    app(video_link, args.name, args.lib, args.show, args.flip_hor, args.flip_ver)
+
+    record = None
+    if args.record:
+        record = dict(height=args.record_height, codec=args.codec,
+                      every=args.record_every, policy=args.record_policy)
+
+    app(video_link, args.name, args.lib, args.show, args.flip_hor, args.flip_ver,
+        args.cache, args.cache_key, record, args.index, args.mem_budget,
+        args.mem_trace)
 
 
 if __name__ == '__main__':
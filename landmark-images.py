@@ -0,0 +1,121 @@
+"""
+Image Batch Landmark Detection
+==============================
+
+Detect faces and facial landmarks of still images from a directory or a
+glob pattern. Images are decoded at a reduced scale by background threads
+ahead of inference, equal-sized images are detected in batches and
+results are streamed out as JSON lines, so memory stays flat on large
+folders. Coordinates are given in the original image's resolution.
+
+usage: landmark-images.py [-h] --images IMAGES [--lib LIB] [--output OUTPUT]
+                          [--points POINTS] [--batch_size BATCH_SIZE]
+                          [--workers WORKERS] [--prefetch PREFETCH]
+
+optional arguments:
+    -h, --help            show this help message and exit
+    --images IMAGES, -i IMAGES
+                          image directory or glob pattern (quoted)
+    --lib LIB, -l LIB     name of face detector in use
+    --output OUTPUT, -o OUTPUT
+                          path to output JSON-lines file
+    --points POINTS, -p POINTS
+                          number of facial points (5 or 68)
+    --batch_size BATCH_SIZE, -b BATCH_SIZE
+                          number of equal-sized images detected at once
+    --workers WORKERS, -w WORKERS
+                          number of decoding threads (default: #CPUs)
+    --prefetch PREFETCH   number of images decoded ahead of inference
+"""
+
+import json
+
+import numpy as np
+import cv2 as cv
+
+from altusi.configs import config as cfg
+from altusi.core.detection import FaceDetector
+from altusi.core.detection import FaceLandmarker
+
+from altusi.helper import funcs as fn
+from altusi.utils.imageloader import ImageLoader
+from altusi.utils.logger import *
+
+
+def processGroup(group, face_detector, face_landmarker, n_points, out_file):
+    """Detect faces and landmarks of equal-sized images and write results"""
+
+    results = face_detector.getFacesBatch([image for _, _, image in group])
+    for (path, size, image), (confs, bboxes) in zip(group, results):
+        landmarks = face_landmarker.findLandmarks(image, bboxes, n_points) \
+                        if len(bboxes) else []
+
+        scale = 1. * size[1] / image.shape[0]
+        record = {
+            'path': path,
+            'size': list(size),
+            'confs': [float(conf) for conf in confs] if confs is not None else None,
+            'bboxes': [[int(v * scale + 0.5) for v in bbox] for bbox in bboxes],
+            'landmarks': [[[int(x * scale + 0.5), int(y * scale + 0.5)]
+                           for x, y in landmark] for landmark in landmarks]
+        }
+        out_file.write(json.dumps(record) + '\n')
+
+
+def main(args):
+    if cfg.NUM_THREADS >= 0:
+        cv.setNumThreads(cfg.NUM_THREADS)
+
+    batch_size = args.batch_size if args.batch_size else cfg.IMAGE_BATCH_SIZE
+    loader = ImageLoader(args.images, workers=args.workers, prefetch=args.prefetch)
+    face_detector = FaceDetector(lib=args.lib)
+    face_landmarker = FaceLandmarker()
+
+    # images waiting for a batch, grouped by size
+    groups, n_waiting = {}, 0
+    n_images, n_logged = 0, 0
+    _start_t = time.time()
+    with open(args.output, 'w') as out_file:
+        for path, size, image in loader:
+            group = groups.setdefault(image.shape, [])
+            group.append((path, size, image) )
+            n_waiting += 1
+            n_images += 1
+
+            if len(group) >= batch_size:
+                ready = [groups.pop(image.shape)]
+            elif n_waiting >= 2 * batch_size:
+                # many sizes are mixed, flush all to bound memory
+                ready = list(groups.values() )
+                groups = {}
+            else:
+                continue
+
+            for group in ready:
+                processGroup(group, face_detector, face_landmarker, args.points, out_file)
+                n_waiting -= len(group)
+            out_file.flush()
+
+            n_done = n_images - n_waiting
+            if n_done - n_logged >= 1000:
+                LOG(INFO, 'Processed {} images - {:.2f} images/s'.format(
+                    n_done, n_done / (time.time() - _start_t) ) )
+                n_logged = n_done
+
+        for group in groups.values():
+            processGroup(group, face_detector, face_landmarker, args.points, out_file)
+
+    face_landmarker.close()
+    LOG(INFO, 'Processed {} images in {:.1f}s'.format(n_images, time.time() - _start_t) )
+    LOG(INFO, 'Results written to', args.output)
+
+
+if __name__ == '__main__':
+    print(__doc__)
+
+    LOG(INFO, 'Experiment: Facial Landmark detection on image directories')
+
+    args = fn.getImagesArgs()
+    main(args)
+
+    LOG(INFO, 'Process done')
@@ -0,0 +1,102 @@
+"""
+Offline Landmark Tracking
+=========================
+
+Track facial landmarks over every frame of a recording at a fraction of
+the cost: Face detection and landmarking run on adaptively chosen
+keyframes only, in-between frames are interpolated. Landmarks are saved
+as a NaN-padded (F, N, 68, 2) array readable by `geometry.loadLandmarks`,
+next to an (F, N) array of track ids, -1 for padding.
+
+usage: landmark-offline.py [-h] --video VIDEO [--lib LIB] [--output OUTPUT]
+                           [--min_gap MIN_GAP] [--max_gap MAX_GAP]
+                           [--motion MOTION] [--check_every CHECK_EVERY]
+                           [--smooth SMOOTH]
+
+optional arguments:
+    -h, --help            show this help message and exit
+    --video VIDEO, -v VIDEO
+                          path to recorded video
+    --lib LIB, -l LIB     name of face detector in use
+    --output OUTPUT, -o OUTPUT
+                          path to output landmarks file (default: <VIDEO>.npz)
+    --min_gap MIN_GAP     minimum number of frames between keyframes
+    --max_gap MAX_GAP     maximum number of frames between keyframes
+    --motion MOTION       accumulated motion triggering a keyframe
+    --check_every CHECK_EVERY
+                          run full inference every N frames to estimate error
+    --smooth SMOOTH       smoothing weight of the current frame (1: no smoothing)
+"""
+
+import os
+
+import numpy as np
+import cv2 as cv
+
+from altusi.configs import config as cfg
+from altusi.core.detection import FaceDetector
+from altusi.core.detection import FaceLandmarker
+from altusi.core.tracking import KeyframeTracker
+
+from altusi.helper import funcs as fn
+from altusi.utils import imgproc, geometry
+from altusi.utils.bufferpool import BufferPool
+from altusi.utils.logger import *
+
+
+def readFrames(video_link, pool):
+    """Read frames of a video resized to the working height"""
+
+    cap = cv.VideoCapture(video_link)
+    H = int(cap.get(cv.CAP_PROP_FRAME_HEIGHT) )
+    W = int(cap.get(cv.CAP_PROP_FRAME_WIDTH) )
+    while cap.isOpened():
+        _, frm = cap.read(pool.get('capture', (H, W, 3) ) )
+        if not _: break
+
+        yield imgproc.resizeByHeight(frm, cfg.FRAME_HEIGHT, dst=pool.get('frame',
+                    imgproc.getShapeByHeight(frm.shape, cfg.FRAME_HEIGHT) ) )
+    cap.release()
+
+
+def main(args):
+    if cfg.NUM_THREADS >= 0:
+        cv.setNumThreads(cfg.NUM_THREADS)
+
+    pool = BufferPool()
+    face_detector = FaceDetector(lib=args.lib, pool=pool)
+    face_landmarker = FaceLandmarker()
+    tracker = KeyframeTracker(face_detector, face_landmarker,
+                              min_gap=args.min_gap, max_gap=args.max_gap,
+                              motion=args.motion, check_every=args.check_every,
+                              smooth=args.smooth)
+
+    _start_t = time.time()
+    frames_landmarks, frames_ids = [], []
+    for idx, ids, landmarks in tracker.track(readFrames(args.video, pool) ):
+        frames_landmarks.append(landmarks)
+        frames_ids.append(ids)
+    _prx_t = time.time() - _start_t
+    face_landmarker.close()
+
+    output = args.output if args.output else os.path.splitext(args.video)[0] + '.npz'
+    geometry.saveLandmarks(output,
+                           geometry.packLandmarks(frames_landmarks, n_points=68),
+                           ids=geometry.packIds(frames_ids) )
+
+    stats = tracker.stats
+    LOG(INFO, 'Tracked {} frames in {:.1f}s ({:.2f} FPS)'.format(
+        stats['frames'], _prx_t, stats['frames'] / max(_prx_t, 1e-9) ) )
+    LOG(INFO, 'Tracking stats:', stats)
+    LOG(INFO, 'Landmarks written to', output)
+
+
+if __name__ == '__main__':
+    print(__doc__)
+
+    LOG(INFO, 'Experiment: Offline Facial Landmark tracking')
+
+    args = fn.getOfflineArgs()
+    main(args)
+
+    LOG(INFO, 'Process done')
@@ -0,0 +1,101 @@
+import time
+import sqlite3
+
+from altusi.core.detection.detectioncache import DetectionCache
+
+
+def makeCache(tmp_path, **kwargs):
+    return DetectionCache(str(tmp_path / 'detections.db'), **kwargs)
+
+
+def test_get_counts_hits_and_misses(tmp_path):
+    cache = makeCache(tmp_path)
+    key = DetectionCache.makeKey('video', 1, {'lib': 'dnn'})
+
+    assert cache.get(key) is None
+    cache.put(key, [0.9], [(1, 2, 3, 4)])
+    assert cache.get(key) == ([0.9], [(1, 2, 3, 4)])
+
+    assert (cache.n_hits, cache.n_misses) == (1, 1)
+    assert cache.hit_rate == 0.5
+    cache.close()
+
+
+def test_results_persist_across_reopening(tmp_path):
+    cache = makeCache(tmp_path)
+    key = DetectionCache.makeKey('video', 1, {'lib': 'dlib'})
+    cache.put(key, None, [(5, 6, 7, 8)])
+    cache.close()
+
+    cache = makeCache(tmp_path)
+    assert cache.n_entries == 1
+    assert cache.get(key) == (None, [(5, 6, 7, 8)])
+    cache.close()
+
+
+def test_keys_depend_on_config():
+    key_a = DetectionCache.makeKey('video', 1, {'lib': 'dnn', 'height': 600})
+    key_b = DetectionCache.makeKey('video', 1, {'height': 600, 'lib': 'dnn'})
+    key_c = DetectionCache.makeKey('video', 1, {'lib': 'dnn', 'height': 400})
+
+    assert key_a == key_b
+    assert key_a != key_c
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = makeCache(tmp_path, max_entries=3, flush_every=1)
+    keys = [DetectionCache.makeKey('video', i, {}) for i in range(4)]
+
+    for key in keys[:3]:
+        cache.put(key, [1.], [(0, 0, 1, 1)])
+        time.sleep(0.01)
+    cache.get(keys[0])
+    time.sleep(0.01)
+    cache.put(keys[3], [1.], [(0, 0, 1, 1)])
+
+    assert cache.n_entries == 3
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[3]) is not None
+    cache.close()
+
+
+def test_replacing_an_entry_keeps_the_count(tmp_path):
+    cache = makeCache(tmp_path, flush_every=1)
+    key = DetectionCache.makeKey('video', 1, {})
+
+    cache.put(key, [1.], [(0, 0, 1, 1)])
+    cache.put(key, [0.5], [(0, 0, 2, 2)])
+
+    assert cache.n_entries == 1
+    assert cache.get(key) == ([0.5], [(0, 0, 2, 2)])
+    cache.close()
+
+
+def test_entry_bound_holds_across_processes(tmp_path):
+    caches = [makeCache(tmp_path, max_entries=10, flush_every=1) for _ in range(2)]
+
+    for i in range(8):
+        for j, cache in enumerate(caches):
+            cache.put(DetectionCache.makeKey('video', (i, j), {}), [1.], [(0, 0, 1, 1)])
+
+    assert caches[-1].n_entries == 10
+    for cache in caches:
+        cache.close()
+
+    conn = sqlite3.connect(str(tmp_path / 'detections.db') )
+    assert conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0] == 10
+    conn.close()
+
+
+def test_count_is_initialized_from_an_existing_table(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'detections.db') )
+    conn.execute('CREATE TABLE entries (key TEXT PRIMARY KEY, result TEXT, accessed REAL)')
+    conn.executemany('INSERT INTO entries VALUES (?, ?, ?)',
+                     [(str(i), '[null, []]', 0.) for i in range(3)])
+    conn.commit()
+    conn.close()
+
+    cache = makeCache(tmp_path)
+    assert cache.n_entries == 3
+    cache.close()
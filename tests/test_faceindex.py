@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from altusi.utils.faceindex import FaceIndexWriter, FaceIndex, getIntervals
+
+
+def test_intervals_span_until_the_next_processed_frame():
+    frames = np.array([0, 3, 6, 9])
+    counts = np.array([0, 1, 2, 0])
+
+    assert getIntervals(frames, counts, 12).tolist() == [[3, 9]]
+    assert getIntervals(frames, counts, 12, min_faces=2).tolist() == [[6, 9]]
+
+
+def test_intervals_reach_the_end_of_the_recording():
+    intervals = getIntervals(np.array([0, 3]), np.array([1, 1]), 5)
+
+    assert intervals.tolist() == [[0, 5]]
+
+
+def test_intervals_of_an_empty_index():
+    intervals = getIntervals(np.array([], dtype=np.int64),
+                             np.array([], dtype=np.uint16), 0)
+
+    assert intervals.shape == (0, 2)
+
+
+@pytest.fixture
+def face_index(tmp_path):
+    path = str(tmp_path / 'faces.npz')
+    writer = FaceIndexWriter(path, fps=10., frame_size=(640, 480) )
+    writer.add(0, [])
+    writer.add(3, [(10, 10, 20, 20)], scale=2.)
+    writer.add(6, [(0, 0, 10, 10), (50, 50, 30, 30)])
+    writer.add(9, [])
+    writer.close(n_frames=12)
+    return FaceIndex(path)
+
+
+def test_index_stores_boxes_in_source_resolution(face_index):
+    assert face_index.frame_size == (640, 480)
+    assert face_index.boxes[1].tolist() == [20, 20, 60, 60]
+    assert face_index.max_sizes.tolist() == [0, 40, 30, 0]
+
+
+def test_interval_queries(face_index):
+    assert np.allclose(face_index.getIntervals(), [[0.3, 0.9]])
+    assert np.allclose(face_index.getIntervals(0.4, 0.7), [[0.4, 0.7]])
+    assert np.allclose(face_index.getIntervals(min_faces=2), [[0.6, 0.9]])
+    assert face_index.getIntervals(1.0, 1.2).shape == (0, 2)
+
+
+def test_count_queries(face_index):
+    assert face_index.count() == {
+        'processed_frames': 4,
+        'frames_with_faces': 6,
+        'seconds_with_faces': 0.6,
+        'faces': 3,
+        'max_faces': 2,
+        'max_face_size': 40
+    }
+
+    counts = face_index.count(0.6, 1.2)
+    assert counts['processed_frames'] == 2
+    assert counts['frames_with_faces'] == 3
+    assert counts['faces'] == 2
+
+
+def test_first_appearance_queries(face_index):
+    assert face_index.firstAppearance() == pytest.approx(0.3)
+    assert face_index.firstAppearance(0.5) == pytest.approx(0.5)
+    assert face_index.firstAppearance(min_faces=2) == pytest.approx(0.6)
+    assert face_index.firstAppearance(1.0) is None
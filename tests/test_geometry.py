@@ -0,0 +1,137 @@
+import numpy as np
+import cv2 as cv
+import pytest
+
+from altusi.utils import geometry
+
+
+def test_pack_landmarks_by_position():
+    frames_landmarks = [np.ones((1, 68, 2) ), 2 * np.ones((2, 68, 2) )]
+
+    landmarks = geometry.packLandmarks(frames_landmarks)
+
+    assert landmarks.shape == (2, 2, 68, 2)
+    assert np.isnan(landmarks[0, 1]).all()
+    assert (landmarks[1] == 2).all()
+
+
+def test_pack_ids_and_get_one_track():
+    frames_landmarks = [np.ones((1, 68, 2) ), 2 * np.ones((2, 68, 2) )]
+    frames_ids = [np.array([7]), np.array([3, 7])]
+
+    landmarks = geometry.packLandmarks(frames_landmarks)
+    ids = geometry.packIds(frames_ids)
+
+    assert ids.tolist() == [[7, -1], [3, 7]]
+    track = geometry.getTrack(landmarks, ids, 3)
+    assert track.shape == (2, 68, 2)
+    assert np.isnan(track[0]).all()
+    assert (track[1] == 2).all()
+    assert (geometry.getTrack(landmarks, ids, 7)[0] == 1).all()
+
+
+def test_saved_landmarks_round_trip(tmp_path):
+    path = str(tmp_path / 'landmarks.npz')
+    landmarks = geometry.packLandmarks([np.ones((2, 68, 2) )])
+    ids = geometry.packIds([np.array([0, 4])])
+
+    geometry.saveLandmarks(path, landmarks, ids=ids)
+    frames, loaded, loaded_ids = geometry.loadLandmarks(path)
+
+    assert frames.tolist() == [0]
+    assert np.array_equal(loaded, landmarks)
+    assert loaded_ids.tolist() == [[0, 4]]
+
+
+def test_pack_landmarks_rejects_other_number_of_points():
+    with pytest.raises(ValueError):
+        geometry.packLandmarks([[ [(0, 0)] * 5 ]], n_points=68)
+
+
+def makeFace(eye_open=1., mouth_open=0.):
+    """68-point face with eyes 6 wide, centered 20 apart, and an 8-wide mouth"""
+
+    landmarks = np.zeros((68, 2) )
+    for idxs, x0 in ((geometry.LEFT_EYE_IDXS, 0.), (geometry.RIGHT_EYE_IDXS, 20.) ):
+        landmarks[list(idxs)] = [(x0, 0), (x0 + 2, -eye_open), (x0 + 4, -eye_open),
+                                 (x0 + 6, 0), (x0 + 4, eye_open), (x0 + 2, eye_open)]
+    landmarks[list(geometry.INNER_MOUTH_IDXS)] = [
+        (5, 30), (7, 30 - mouth_open), (9, 30 - mouth_open), (11, 30 - mouth_open),
+        (13, 30), (11, 30 + mouth_open), (9, 30 + mouth_open), (7, 30 + mouth_open)]
+    return landmarks
+
+
+def test_eye_aspect_ratio_of_open_and_closed_eyes():
+    ears = geometry.getEyeAspectRatio(np.stack([makeFace(1.5), makeFace(0.)]) )
+
+    assert np.allclose(ears, [[0.5, 0.5], [0., 0.]])
+
+
+def test_mouth_aspect_ratio_of_open_and_closed_mouth():
+    mars = geometry.getMouthAspectRatio(np.stack([makeFace(mouth_open=4.),
+                                                  makeFace(mouth_open=0.)]) )
+
+    assert np.allclose(mars, [1.5, 0.])
+
+
+def test_face_size_and_roll():
+    angle = np.radians(30.)
+    rotation = np.array([[np.cos(angle), -np.sin(angle)],
+                         [np.sin(angle), np.cos(angle)]])
+    faces = np.stack([makeFace(), makeFace() @ rotation.T])
+
+    sizes = geometry.getFaceSize(faces)
+    assert np.allclose(sizes[:, 2], 20.)
+    assert np.allclose(sizes[0, :2], (26., 31.) )
+    assert np.allclose(geometry.getFaceOrientation(faces), [0., 30.])
+
+
+def test_measures_propagate_nan_of_padded_faces():
+    faces = np.stack([makeFace(), np.full((68, 2), np.nan)])
+
+    assert np.isfinite(geometry.getEyeAspectRatio(faces)[0]).all()
+    assert np.isnan(geometry.getEyeAspectRatio(faces)[1]).all()
+    assert np.isnan(geometry.getMouthAspectRatio(faces)[1])
+    assert np.isnan(geometry.getFaceSize(faces)[1]).all()
+    assert np.isnan(geometry.getFaceOrientation(faces)[1])
+
+
+def projectHeadPose(pitch, yaw, roll, image_size):
+    """Landmarks of the generic head model rotated by (pitch, yaw, roll)"""
+
+    p, y, r = np.radians([pitch, yaw, roll])
+    Rx = np.array([[1, 0, 0], [0, np.cos(p), -np.sin(p)], [0, np.sin(p), np.cos(p)]])
+    Ry = np.array([[np.cos(y), 0, np.sin(y)], [0, 1, 0], [-np.sin(y), 0, np.cos(y)]])
+    Rz = np.array([[np.cos(r), -np.sin(r), 0], [np.sin(r), np.cos(r), 0], [0, 0, 1]])
+    rvec, _ = cv.Rodrigues(Rz @ Ry @ Rx)
+
+    W, H = image_size
+    camera_matrix = np.array([[W, 0, W / 2.], [0, W, H / 2.], [0, 0, 1.]])
+    points, _ = cv.projectPoints(geometry.HEAD_POSE_MODEL, rvec,
+                                 np.array([0., 0., 2000.]), camera_matrix,
+                                 np.zeros((4, 1) ) )
+
+    landmarks = np.zeros((68, 2) )
+    landmarks[list(geometry.HEAD_POSE_IDXS)] = points.reshape(-1, 2)
+    return landmarks
+
+
+@pytest.mark.parametrize('pose', [(0., 0., 0.), (10., -25., 5.), (-15., 20., -10.)])
+def test_head_pose_round_trips_through_projection(pose):
+    landmarks = projectHeadPose(*pose, image_size=(640, 480) )
+
+    poses = geometry.getHeadPose(landmarks[None], (640, 480) )
+
+    assert poses.shape == (1, 3)
+    assert np.allclose(poses[0], pose, atol=1e-3)
+
+
+def test_head_pose_of_padded_faces_is_nan():
+    faces = np.stack([projectHeadPose(10., -25., 5., (640, 480) ),
+                      np.full((68, 2), np.nan)])[None]
+
+    poses = geometry.getHeadPose(faces, (640, 480) )
+
+    assert poses.shape == (1, 2, 3)
+    assert np.allclose(poses[0, 0], (10., -25., 5.), atol=1e-3)
+    assert np.isnan(poses[0, 1]).all()
@@ -0,0 +1,82 @@
+import numpy as np
+
+from altusi.core.tracking import KeyframeTracker
+
+
+class ScriptedDetector:
+    """Detector returning scripted boxes of the frame whose index is
+    written in its first pixel"""
+
+    def __init__(self, script):
+        self.script = script
+        self.calls = []
+
+    def getFaces(self, frame):
+        idx = int(frame[0, 0, 0])
+        self.calls.append(idx)
+        bboxes = [np.array(bbox) for bbox in self.script(idx)]
+        return [1.] * len(bboxes), bboxes
+
+
+class BoxLandmarker:
+    """Landmarker placing point k of a face at its top-left corner + k"""
+
+    def findLandmarks(self, image, bboxes, n_points=None):
+        return [[(bbox[0] + k, bbox[1] + k) for k in range(68)]
+                for bbox in bboxes]
+
+
+def makeFrames(n_frames):
+    for idx in range(n_frames):
+        frame = np.zeros((64, 64, 3), dtype=np.uint8)
+        frame[0, 0, 0] = idx
+        yield frame
+
+
+def track(script, n_frames, **kwargs):
+    kwargs = dict(dict(min_gap=1, max_gap=4, motion=1e9, check_every=0,
+                       smooth=1.), **kwargs)
+    detector = ScriptedDetector(script)
+    tracker = KeyframeTracker(detector, BoxLandmarker(), **kwargs)
+    return list(tracker.track(makeFrames(n_frames) ) ), detector, tracker
+
+
+def test_inference_runs_on_keyframes_only():
+    results, detector, tracker = track(lambda idx: [(10, 10, 20, 20)], 10)
+
+    assert [idx for idx, _, _ in results] == list(range(10) )
+    assert detector.calls == [0, 4, 8, 9]
+    assert tracker.stats['keyframes'] == 4
+    assert tracker.stats['cost'] == 0.4
+
+
+def test_in_between_frames_are_interpolated():
+    results, _, _ = track(lambda idx: [(10 + idx, 10, 20, 20)], 9)
+
+    for idx, ids, landmarks in results:
+        assert list(ids) == [0]
+        assert landmarks.shape == (1, 68, 2)
+        assert np.allclose(landmarks[0, 0], (10 + idx, 10) )
+
+
+def test_faces_keep_their_ids_across_keyframes():
+    def script(idx):
+        faces = [(0, 0, 10, 10), (40, 40, 10, 10)]
+        if idx >= 4:
+            faces.insert(0, (20, 0, 10, 10) )
+        return faces
+
+    results, _, _ = track(script, 9)
+
+    _, ids, landmarks = results[8]
+    assert list(ids) == [0, 1, 2]
+    assert np.allclose(landmarks[:, 0], [(0, 0), (40, 40), (20, 0)])
+
+
+def test_unmatched_faces_are_held_until_half_of_the_gap():
+    def script(idx):
+        return [(0, 0, 10, 10)] if idx < 4 else [(40, 40, 10, 10)]
+
+    results, _, _ = track(script, 5)
+
+    assert [list(ids) for _, ids, _ in results] == [[0], [0], [1], [1], [1]]